@@ -0,0 +1,170 @@
+import chess
+import json
+import random
+import sys
+import time
+import settings
+from engine import Engine
+from evaluator import get_eval
+from transposition_table import TranspositionTable, EXACT
+
+# Fixed positions, never edit without resetting the signature in the commit message
+BENCH_FENS = [
+    # Openings
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",
+    "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "rnbqkb1r/pp3ppp/4pn2/2pp4/2PP4/2N2N2/PP2PPPP/R1BQKB1R w KQkq - 0 5",
+    "rnbqk2r/ppp1ppbp/3p1np1/8/2PPP3/2N5/PP3PPP/R1BQKBNR w KQkq - 0 5",
+    "r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7",
+
+    # Middlegames
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R w - - 7 14",
+    "r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1 w - - 2 14",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    "r1q2rk1/2p1bppp/2Pp4/p6b/Q1PNp3/4B3/PP1R1PPP/2K4R w - - 2 18",
+    "4k2r/1pb2ppp/1p2p3/1R1p4/3P4/2r1PN2/P4PPP/1R4K1 b - - 3 22",
+    "3q2k1/pb3p1p/4pbp1/2r5/PpN2N2/1P2P2P/5PP1/Q2R2K1 b - - 4 26",
+    "r3k2r/3nnpbp/q2pp1p1/p7/Pp1PPPP1/4BNN1/1P5P/R2Q1RK1 w kq - 0 16",
+
+    # Endgames
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+    "6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/3N4 b - - 0 1",
+    "3b4/5kp1/1p1p1p1p/pP1PpP1P/P1P1P3/3KN3/8/8 w - - 0 1",
+    "2K5/p7/7P/5pR1/8/5k2/r7/8 w - - 0 1",
+    "8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4 w - - 0 1",
+    "7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8 w - - 0 1",
+    "8/2p5/8/2kPKp1p/2p4P/2P5/3P4/8 w - - 0 1",
+    "8/1p3pp1/7p/5P1P/2k3P1/8/2K2P2/8 w - - 0 1",
+    "8/pp2r1k1/2p1p3/3pP2p/1P1P1P1P/P5KR/8/8 w - - 0 1",
+    "8/3p4/p1bk3p/Pp6/1Kp1PpPp/2P2P1P/2P5/5B2 b - - 0 1",
+    "5k2/7R/4P2p/5K2/p1r2P1p/8/8/8 b - - 0 1",
+    "6k1/6p1/P6p/r1N5/5p2/7P/1b3PP1/4R1K1 w - - 0 1",
+    "6k1/4pp1p/3p2p1/P1pPb3/R7/1r2P1PP/3B1P2/6K1 w - - 0 1",
+    "8/3p3B/5p2/5P2/p7/PP5b/k7/6K1 w - - 0 1",
+    "8/5pk1/6p1/8/5P2/6PK/8/8 w - - 0 1",
+
+    # Tactics
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1",
+    "8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/8 b - - 0 1",
+    "5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - - 0 1",
+    "r1bq2rk/pp3pbp/2p1p1pQ/7P/3P4/2PB1N2/PP3PP1/R3KR2 w Q - 0 1",
+    "5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - - 0 1",
+    "7k/p7/1R5K/6r1/6p1/6P1/8/8 w - - 0 1",
+    "r4q1k/p2bR1rp/2p2Q1N/5p2/5p2/2P5/PP3PPP/R5K1 w - - 0 1",
+    "2br2k1/2q3rn/p2NppQ1/2p1P3/Pp5R/4P3/1P3PPP/3R2K1 w - - 0 1",
+]
+
+# Fixed depth (or node limited) search of every position from a cleared engine, the node total is the signature:
+# it only changes when the search or eval behaves differently
+def bench_search(engine, depth, nodes=None):
+    results = []
+    start = time.time()
+
+    for fen in BENCH_FENS:
+        engine.new_game()
+        position_start = time.time()
+        move = engine.get_best_move(chess.Board(fen), depth, nodes=nodes)
+        results.append({"fen": fen, "move": str(move), "nodes": engine.total_nodes, "time": round(time.time() - position_start, 4)})
+
+    elapsed = time.time() - start
+    total_nodes = sum(result["nodes"] for result in results)
+
+    return {"depth": depth, "node_limit": nodes, "signature": total_nodes, "time": round(elapsed, 4), "nps": int(total_nodes / elapsed), "positions": results}
+
+# Average microseconds per call of <function> over <count> calls for every argument
+def time_calls(function, arguments, count):
+    function(arguments[0])  # Leaves njit compilation out of the timing
+
+    start = time.perf_counter()
+    for argument in arguments:
+        for _ in range(count):
+            function(argument)
+
+    return round((time.perf_counter() - start) * 1e6 / (count * len(arguments)), 3)
+
+# Incremental eval + hash push/pop, average microseconds per push and pop pair
+def time_push_pop(engine, boards, count):
+    elapsed = 0
+    pairs = 0
+
+    for board in boards:
+        engine.evaluator.reset(board)
+        engine.hasher.reset(board)
+        moves = list(board.legal_moves)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            for move in moves:
+                engine.push(board, move)
+                engine.pop(board)
+        elapsed += time.perf_counter() - start
+        pairs += count * len(moves)
+
+    return round(elapsed * 1e6 / pairs, 3)
+
+def bench_micro(engine, count=200):
+    boards = [chess.Board(fen) for fen in BENCH_FENS]
+
+    # Random keys into a fresh table, half of them already stored
+    tt = TranspositionTable(16)
+    rng = random.Random(0)
+    keys = [rng.getrandbits(64) for _ in range(1000)]
+    move = chess.Move.from_uci("e2e4")
+
+    def tt_store_lookup(key):
+        tt.store(key, 4, 10, EXACT, move)
+        tt.lookup(key ^ 1, 4)
+
+    return {
+        "get_eval_us": time_calls(get_eval, boards, count),
+        "pick_moves_us": time_calls(lambda board: list(engine.pick_moves(board, None, 0)), boards, count),
+        "legal_moves_us": time_calls(lambda board: list(board.legal_moves), boards, count),
+        "legal_captures_us": time_calls(lambda board: list(board.generate_legal_captures()), boards, count),
+        "push_pop_us": time_push_pop(engine, boards, count // 20),
+        "tt_store_lookup_us": time_calls(tt_store_lookup, keys, count // 10),
+    }
+
+# python bench.py [depth] [nodes <n>] [json]
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5
+    nodes = int(sys.argv[sys.argv.index("nodes") + 1]) if "nodes" in sys.argv else None
+    as_json = "json" in sys.argv
+
+    engine = Engine()
+    engine.verbose = False
+
+    # Node limited runs go as deep as the limit allows
+    if nodes and not sys.argv[1].isdigit():
+        depth = settings.MAX_DEPTH
+
+    result = bench_search(engine, depth, nodes)
+    result["micro"] = bench_micro(engine)
+
+    if as_json:
+        print(json.dumps(result))
+    else:
+        for position in result["positions"]:
+            print(f"{position['fen']}: {position['move']} - {position['nodes']} nodes, {position['time']:.2f}s")
+
+        print()
+        for name, value in result["micro"].items():
+            print(f"{name}: {value}")
+
+        print()
+        print(f"Depth {depth}" + (f", {nodes} node limit" if nodes else "") + f": {result['signature']} nodes in {result['time']:.2f}s, {result['nps']} nps")
+        print(f"Signature: {result['signature']}")
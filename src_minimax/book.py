@@ -1,13 +1,19 @@
 import chess
+import chess.polyglot
 import random
+import settings
+from zobrist import get_hash
 
+# Polyglot .bin book (memory mapped, binary searched by zobrist key) with the built-in lines as fallback
 class OpeningBook:
-    def __init__(self):
-        self.book = {}
+    def __init__(self, path=settings.BOOK_FILE, max_ply=settings.BOOK_MAX_PLY):
+        self.book = {}  # Built-in lines, zobrist key -> moves
+        self.reader = chess.polyglot.open_reader(path) if path else None
+        self.max_ply = max_ply
         self.construct()
 
     def add_entry(self, board, next_move):
-        hash = board.board_fen().__hash__()
+        hash = get_hash(board)
 
         if hash in self.book:
             if next_move not in self.book[hash]:
@@ -16,12 +22,28 @@ class OpeningBook:
         else:
             self.book[hash] = [next_move]
 
-    def lookup(self, hash):
+    # Book move for <board> or None, polyglot moves are picked in proportion to their weights
+    def lookup(self, board):
+        if board.ply() >= self.max_ply:
+            return None
+
+        if self.reader:
+            try:
+                return self.reader.weighted_choice(board).move
+            except IndexError:
+                pass
+
+        hash = get_hash(board)
         if hash in self.book:
             return random.choice(self.book[hash])
 
         return None
 
+    def close(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
     def construct(self):
         openings = [
             # Sveshnikov Sicilian
@@ -37,8 +59,9 @@ class OpeningBook:
         for opening in openings:
             board = chess.Board()
             for i in range(len(opening)):
-                self.add_entry(board, opening[i])
-                board.push(chess.Move.from_uci(opening[i]))
+                move = chess.Move.from_uci(opening[i])
+                self.add_entry(board, move)
+                board.push(move)
 
 
 if __name__ == "__main__":
@@ -1,257 +1,395 @@
 import chess
-from evaluator import get_eval, PIECE_VALUES
-from transposition_table import TranspositionTable
+from evaluator import IncrementalEvaluator, get_touched_squares, PIECE_VALUES
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER, MATE_SCORE, MATE_BOUND, pack_move, unpack_move
+from zobrist import IncrementalHash, get_hash
 from book import OpeningBook
 import math
+import numpy as np
+import random
+import threading
 import time
 import settings
+from time_manager import TimeManager, SearchTimeout
+from search_stats import SearchStats
+from tablebase import Tablebase
+import cProfile
+
+MAX_PLY = 128
+HISTORY_MAX = 50000  # Stays under the counter move score in pick_moves
 
 class Engine:
     def __init__(self):
-        self.tt = TranspositionTable()
+        self.tt = TranspositionTable(settings.TT_SIZE_MB)
+        self.hasher = IncrementalHash()
+        self.evaluator = IncrementalEvaluator()
         self.book = OpeningBook()
+        self.tablebase = Tablebase(settings.SYZYGY_PATH, settings.SYZYGY_PIECES) if settings.SYZYGY_PATH else None
         self.nodes_searched = 0
         self.quiescence_cap = 10  # Cut off quiescence at 10 moves
-        self.killer_moves = {}
+        self.killer_moves = np.zeros((MAX_PLY, 2), dtype=np.uint16)  # 2 packed moves per ply, 0 = empty
+        self.history = np.zeros((2, 64, 64), dtype=np.int32)  # Butterfly: side, from, to
+        self.counter_moves = np.zeros((64, 64), dtype=np.uint16)  # Packed refutation of the previous move's from, to
         self.starting_depth = 0
+        self.time_manager = TimeManager()
+        self.stop_event = None  # Anything with is_set(), checked alongside the clock
+        self.smp = None
+        self.shuffle_root = False  # Lazy SMP helpers vary root move order
+        self.verbose = True
+        self.info_callback = None  # Called as (depth, score, total nodes, elapsed s, pv) after every iteration
+        self.total_nodes = 0
+        self.node_limit = None
+        self.stats = SearchStats()  # Last search, see search_stats.py
+        self.profiler = cProfile.Profile() if settings.PROFILE else None  # Accumulates over every search
+        self.null_move = settings.NULL_MOVE
+        self.lmr = settings.LMR
+
+        # Pondering, set before starting a ponder search and cleared by ponderhit()
+        self.pondering = False
+        self.ponder_lock = threading.Lock()
+        self.ponderhit_clock = {}
+        self.ponder_move = None
+
+        # Compile the njit eval kernels now so the first timed search isn't charged for it
+        self.evaluator.reset(chess.Board())
 
     def use_nmp(self):
-        return False
-
-    # Returns eval + best move
-    def minimax(self, board, depth, alpha, beta, maximizing):
+        return self.null_move
+
+    # Push/pop wrappers keeping the incremental eval in sync
+    def push(self, board, move):
+        squares = get_touched_squares(board, move)
+        before = [board.piece_at(square) for square in squares]
+        castling_rights = board.castling_rights
+        board.push(move)
+        start = time.perf_counter()
+        self.evaluator.push(board, squares, before)
+        self.stats.eval_update_time += time.perf_counter() - start
+        self.stats.eval_updates += 1
+        self.hasher.push(board, squares, before, castling_rights)
+
+    def pop(self, board):
+        board.pop()
+        self.evaluator.pop()
+        self.hasher.pop()
+
+    # Eval from the side to move's point of view
+    def get_relative_eval(self, board):
+        self.stats.eval_calls += 1
+        score = self.evaluator.get_eval()
+        return score if board.turn == chess.WHITE else -score
+
+    # Negamax, returns eval (side to move) + best move
+    def negamax(self, board, depth, alpha, beta):
         self.nodes_searched += 1
-        hash = board.board_fen().__hash__()  # Board hash via fen for tt
-
-        tt_score, tt_move = self.tt.lookup(hash, depth)
-        if tt_score is not None:
-            return tt_score, tt_move
+        if (self.nodes_searched & 1023) == 0:
+            self.check_time()
+        hash = self.hasher.get_key()  # Zobrist key for tt
+        ply = len(self.hasher.stack) - 1
 
-        # Game over
-        if board.is_checkmate():
-            if board.turn == chess.WHITE:
-                score = -99999 - depth
-            else:
-                score = 99999 + depth
-            self.tt.store(hash, depth, score)
-            return score, None
-
-        if board.is_stalemate() or board.is_insufficient_material():
-            self.tt.store(hash, depth, 0)
+        # Repetition (once is enough, the side that can avoid it already has) or fifty move draw, the root still searches
+        if ply > 0 and (self.hasher.is_repetition() or (board.halfmove_clock >= 100 and not board.is_checkmate())):
             return 0, None
 
-        # Max depth
-        if depth <= 0:
-            return self.quiescence(board, alpha, beta, maximizing, 0)
+        # Bounds only cut when they fall outside the window, the root always searches so it has a real move
+        tt_score, tt_move = self.tt.lookup(hash, depth, alpha, beta, ply)
+        if tt_score is not None and ply > 0:
+            self.stats.tt_cutoffs += 1
+            return tt_score, tt_move
 
-        # Null move pruning
-        if self.use_nmp() and (self.starting_depth - depth) >= 2 and not board.is_check() and self.has_non_pawn_material(board, board.turn):
-            r = 2
+        if self.is_insufficient_material(board):
+            return 0, None
 
+        # Exact result from the tables, the root is left to probe_root / the search so it still has a move
+        if self.tablebase and ply > 0 and self.tablebase.can_probe(board):
+            self.stats.tb_probes += 1
+            wdl = self.tablebase.probe_wdl(board, hash)
+            if wdl is not None:
+                self.stats.tb_hits += 1
+                return self.tablebase.get_score(wdl, ply), None
+
+        # Max depth, positions in check get one more ply so mates at the horizon are still seen by the move loop
+        in_check = board.is_check()
+        if depth <= 0 and not in_check:
+            # Stalemate would otherwise get the stand pat score, the generator stops at the first legal move
+            if ply > 0 and not any(board.generate_legal_moves()):
+                return 0, None
+            return self.quiescence(board, alpha, beta, 0)
+
+        # Null move pruning, only in null window nodes, never twice in a row and never without pieces (zugzwang)
+        if (self.use_nmp() and ply > 0 and depth > settings.NULL_MOVE_R and beta - alpha == 1 and not in_check
+                and abs(beta) < MATE_BOUND and board.move_stack and board.move_stack[-1]
+                and self.has_non_pawn_material(board, board.turn) and self.get_relative_eval(board) >= beta):
             # Play null
-            board.push(chess.Move.null())
-
-            null_score, _ = self.minimax(board, depth - 1 - r, -beta, -alpha, not maximizing)
+            self.push(board, chess.Move.null())
+            null_score, _ = self.negamax(board, depth - 1 - settings.NULL_MOVE_R, -beta, -beta + 1)
             null_score = -null_score
-
-            board.pop()
+            self.pop(board)
 
             if null_score >= beta:
                 return beta, None
 
-
         best_move = None
+        best_score = -math.inf
+        alpha_orig = alpha
 
-        # Move ordering
-        moves = list(board.legal_moves)
-        ordered_moves = self.order_moves(board, moves, tt_move, depth)
-
-        if maximizing:
-            best_score = -math.inf
-            for move in ordered_moves:
-                board.push(move)
-                score, _ = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-
-                alpha = max(alpha, best_score)
-                if beta <= alpha:
-                    # Killers
-                    if not board.is_capture(move) and not move.promotion:
-                        self.add_killer(move, depth)
-                    break
-
-            self.tt.store(hash, depth, best_score, best_move)
+        quiets_tried = []
 
-            return best_score, best_move
+        for i, move in enumerate(self.pick_moves(board, tt_move, ply)):
+            quiet = not board.is_capture(move) and not move.promotion
+            reducible = quiet and not self.get_killer_score(move, ply)
+            self.push(board, move)
 
-        else:
-            best_score = math.inf
-            for move in ordered_moves:
-                board.push(move)
-                score, _ = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-
-                if score < best_score:
-                    best_score = score
-                    best_move = move
-
-                beta = min(beta, best_score)
-                if beta <= alpha:
-                    # Killers
-                    if not board.is_capture(move) and not move.promotion:
-                        self.add_killer(move, depth)
-                    break
+            # PVS: full window for the first move, null window to prove the rest are worse
+            if i == 0:
+                score = -self.negamax(board, depth - 1, -beta, -alpha)[0]
+            else:
+                # LMR: late quiet moves get a shallower look first, full depth again if they beat alpha
+                reduction = 0
+                if self.lmr and reducible and i >= settings.LMR_FULL_MOVES and depth >= settings.LMR_MIN_DEPTH and not in_check and not board.is_check():
+                    reduction = 2 if i >= 6 and depth >= 6 else 1
 
-            self.tt.store(hash, depth, best_score, best_move)
+                score = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha)[0]
 
-            return best_score, best_move
+                if reduction and score > alpha:
+                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha)[0]
 
-    # Continue to explore noisy moves past default depth cap
-    def quiescence(self, board, alpha, beta, maximizing, quiescence_depth):
-        self.nodes_searched += 1
+                # Beat alpha, re-search with the full window to get the real score
+                if alpha < score < beta:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha)[0]
 
-        if quiescence_depth >= self.quiescence_cap:
-            return get_eval(board), None
+            self.pop(board)
 
-        stand_pat = get_eval(board)
-        best_score = stand_pat
-        best_move = None
-
-        # Delta pruning
-        big_delta = 900
+            if score > best_score:
+                best_score = score
+                best_move = move
 
-        if maximizing:
-            if stand_pat >= beta:
-                return beta, None
+            alpha = max(alpha, best_score)
+            if alpha >= beta:
+                self.stats.beta_cutoffs += 1
+                if i == 0:
+                    self.stats.first_move_cutoffs += 1
+                if quiet:
+                    self.update_quiet_stats(board, move, quiets_tried, depth, ply)
+                break
 
-            if stand_pat + big_delta < alpha:
-                return alpha, None
+            if quiet:
+                quiets_tried.append(move)
 
-            if stand_pat > alpha:
-                alpha = stand_pat
+        # No legal moves, mate (sooner mates score higher) or stalemate
+        if best_move is None:
+            best_score = -MATE_SCORE + ply if in_check else 0
+            self.tt.store(hash, depth, best_score, EXACT, None, ply)
+            return best_score, None
 
-        else:
-            if stand_pat <= alpha:
-                return alpha, None
+        self.tt.store(hash, depth, best_score, self.get_bound(best_score, alpha_orig, beta), best_move, ply)
 
-            if stand_pat - big_delta > beta:
-                return beta, None
+        return best_score, best_move
 
-            if stand_pat < beta:
-                beta = stand_pat
+    # Continue to explore noisy moves past default depth cap
+    def quiescence(self, board, alpha, beta, quiescence_depth):
+        self.nodes_searched += 1
+        self.stats.qnodes += 1
+        if (self.nodes_searched & 1023) == 0:
+            self.check_time()
 
-        noisy_moves = self.get_noisy_moves(board)
+        stand_pat = self.get_relative_eval(board)
 
-        if not noisy_moves:
+        if quiescence_depth >= self.quiescence_cap:
             return stand_pat, None
 
-        ordered_noisy_moves = self.order_moves(board, noisy_moves, None, 0)
-
-        if maximizing:
-            for move in ordered_noisy_moves:
-                board.push(move)
-                score, _ = self.quiescence(board, alpha, beta, False, quiescence_depth+1)
-                board.pop()
-
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-
-                alpha = max(alpha, best_score)
-                if beta <= alpha:
-                    break
-
-            return best_score, best_move
-
-        else:
-            for move in ordered_noisy_moves:
-                board.push(move)
-                score, _ = self.quiescence(board, alpha, beta, True, quiescence_depth+1)
-                board.pop()
+        best_score = stand_pat
+        best_move = None
 
-                if score < best_score:
-                    best_score = score
-                    best_move = move
+        # Delta pruning
+        big_delta = 900
 
-                beta = min(beta, best_score)
-                if beta <= alpha:
-                    break
+        if stand_pat >= beta:
+            return beta, None
 
-            return best_score, best_move
+        if stand_pat + big_delta < alpha:
+            return alpha, None
 
-    # Returns all noisy moves (checks captures promotions)
-    def get_noisy_moves(self, board):
-        noisy_moves = []
+        if stand_pat > alpha:
+            alpha = stand_pat
 
-        for move in board.legal_moves:
-            if board.is_capture(move):
-                noisy_moves.append(move)
+        # Captures that lose material can't raise alpha over stand pat, the picker leaves them out
+        for move in self.pick_moves(board, None, 0, noisy_only=True):
+            self.push(board, move)
+            score, _ = self.quiescence(board, -beta, -alpha, quiescence_depth + 1)
+            score = -score
+            self.pop(board)
 
-            elif move.promotion:
-                noisy_moves.append(move)
+            if score > best_score:
+                best_score = score
+                best_move = move
 
-        return noisy_moves
+            alpha = max(alpha, best_score)
+            if alpha >= beta:
+                break
 
-    def add_killer(self, move, depth):
-        if depth not in self.killer_moves:
-            self.killer_moves[depth] = []
+        return best_score, best_move
 
-        if move in self.killer_moves[depth]:
-            return
+    def add_killer(self, move, ply):
+        packed = pack_move(move)
+        killers = self.killer_moves[ply]
 
-        # Pop oldest if more than 2 killers in a given depth
-        self.killer_moves[depth].insert(0, move)
-        if len(self.killer_moves[depth]) > 2:
-            self.killer_moves[depth].pop()
+        # Newest first, the oldest of the 2 drops out
+        if killers[0] != packed:
+            killers[1] = killers[0]
+            killers[0] = packed
 
-    def get_killer_score(self, move, depth):
-        if depth not in self.killer_moves:
-            return 0
+    def get_killer_score(self, move, ply):
+        packed = pack_move(move)
+        killers = self.killer_moves[ply]
 
-        if move in self.killer_moves[depth]:
-            # First killer move gets better score
-            i = self.killer_moves[depth].index(move)
-            return 70000 - (i * 1000)
+        # First killer move gets better score
+        if killers[0] == packed:
+            return 70000
+        if killers[1] == packed:
+            return 69000
 
         return 0
 
-    def order_moves(self, board, moves, tt_move, depth=0):
-
-        def move_score(move):
-            score = 0
-
-            # 1st tt
-            if move == tt_move:
-                return 1000000
-
-            # 2nd captures (mvv lva)
-            if board.is_capture(move):
-                victim = board.piece_at(move.to_square)
-                attacker = board.piece_at(move.from_square)
+    # Quiet move that caused a beta cutoff, the quiets searched before it get the same amount taken off
+    def update_quiet_stats(self, board, move, quiets_tried, depth, ply):
+        self.add_killer(move, ply)
+
+        previous = board.move_stack[-1] if board.move_stack else None
+        if previous:
+            self.counter_moves[previous.from_square, previous.to_square] = pack_move(move)
+
+        history = self.history[int(board.turn)]
+        bonus = depth * depth
+        history[move.from_square, move.to_square] += bonus
+        for quiet in quiets_tried:
+            history[quiet.from_square, quiet.to_square] -= bonus
+
+        if abs(history[move.from_square, move.to_square]) > HISTORY_MAX:
+            self.history //= 2
+
+    # Killers, counter moves and history, dropped between games
+    def clear_move_ordering(self):
+        self.killer_moves[:] = 0
+        self.history[:] = 0
+        self.counter_moves[:] = 0
+
+    # Staged move picker, each stage is only generated once the ones before it are used up without a cutoff:
+    # tt move, winning/equal captures and promotions, killers, quiets by counter move and history, losing captures
+    # <noisy_only> (quiescence) stops after the good captures
+    def pick_moves(self, board, tt_move, ply, noisy_only=False):
+        if tt_move and board.is_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+
+        # Captures, plus promotions onto an empty square
+        good_captures = []
+        bad_captures = []
+        for move in board.generate_legal_captures():
+            if move != tt_move:
+                score = self.capture_score(board, move)
+                (good_captures if score >= 0 else bad_captures).append((score, move))
+
+        promotions = board.generate_legal_moves(board.pawns & board.occupied_co[board.turn], chess.BB_BACKRANKS & ~board.occupied)
+        for move in promotions:
+            if move != tt_move:
+                good_captures.append((90000 if move.promotion == chess.QUEEN else 80000, move))
+
+        good_captures.sort(key=lambda entry: entry[0], reverse=True)
+        for _, move in good_captures:
+            yield move
+
+        if noisy_only:
+            return
 
-                if victim and attacker:
-                    victim_score = PIECE_VALUES[victim.piece_type] // 100
-                    attacker_score = PIECE_VALUES[attacker.piece_type] // 100
+        killers = []
+        for packed in self.killer_moves[ply].tolist():
+            move = unpack_move(packed)
+            if move and move != tt_move and move not in killers and not move.promotion and not board.is_capture(move) and board.is_legal(move):
+                killers.append(move)
+                yield move
+
+        # Castling is generated as king takes own rook, so only the opponent's squares can be masked out
+        quiets = [move for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied_co[not board.turn])
+                  if not move.promotion and move != tt_move and move not in killers and not board.is_en_passant(move)]
+        if self.shuffle_root and ply == 0:
+            random.shuffle(quiets)  # Sort is stable, so this only reorders ties
+
+        history = self.history[int(board.turn)]
+        previous = board.move_stack[-1] if board.move_stack else None
+        counter_move = int(self.counter_moves[previous.from_square, previous.to_square]) if previous else 0
+
+        def quiet_score(move):
+            # The reply that refuted the previous move last time, then history
+            if counter_move and pack_move(move) == counter_move:
+                return 60000
+            return history[move.from_square, move.to_square]
+
+        for move in sorted(quiets, key=quiet_score, reverse=True):
+            yield move
+
+        bad_captures.sort(key=lambda entry: entry[0], reverse=True)
+        for _, move in bad_captures:
+            yield move
+
+    # Mvv lva, negative for captures that lose material
+    def capture_score(self, board, move):
+        victim = board.piece_type_at(move.to_square) or chess.PAWN  # En passant
+        attacker = board.piece_type_at(move.from_square)
+
+        victim_score = PIECE_VALUES[victim] // 100
+        attacker_score = PIECE_VALUES[attacker] // 100
+        mvv_lva_score = victim_score * 10 - attacker_score
+
+        # Taking something at least as valuable can't lose material, only the rest needs the exchange
+        if not move.promotion and victim_score < attacker_score and self.see(board, move) < 0:
+            return -100000 + mvv_lva_score
+
+        return 100000 + mvv_lva_score
+
+    # Static exchange evaluation: material won by <move> (a capture) if both sides keep recapturing on its square
+    # with their least valuable attacker, x-rays included, pins ignored
+    def see(self, board, move):
+        to_square = move.to_square
+        occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+
+        if board.is_en_passant(move):
+            gain = [PIECE_VALUES[chess.PAWN]]
+            occupied ^= chess.BB_SQUARES[to_square ^ 8]
+        else:
+            gain = [PIECE_VALUES[board.piece_type_at(to_square)] if board.piece_type_at(to_square) else 0]
+
+        # Piece standing on the square, next to be taken
+        on_square = board.piece_type_at(move.from_square)
+        if move.promotion:
+            gain[0] += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+            on_square = move.promotion
+
+        color = not board.turn
+        while True:
+            attackers = board.attackers_mask(color, to_square, occupied) & occupied
+            if not attackers:
+                break
 
-                    mvv_lva_score = victim_score * 10 - attacker_score
-                    score += 100000 + mvv_lva_score
+            for piece_type in chess.PIECE_TYPES:
+                attacker = attackers & board.pieces_mask(piece_type, color)
+                if attacker:
+                    break
 
-            # 3rd promotions
-            elif move.promotion == chess.QUEEN:
-                score += 90000
-            elif move.promotion:
-                score += 80000
+            # King can only take if the square isn't defended any more
+            if piece_type == chess.KING and board.attackers_mask(not color, to_square, occupied) & occupied:
+                break
 
-            else:
-                score += self.get_killer_score(move, depth)
+            gain.append(PIECE_VALUES[on_square] - gain[-1])
+            on_square = piece_type
+            occupied ^= attacker & -attacker
+            color = not color
 
-            return score
+        # Either side can stop recapturing when it would lose
+        for i in range(len(gain) - 1, 0, -1):
+            gain[i - 1] = -max(-gain[i - 1], gain[i])
 
-        return sorted(moves, key=move_score, reverse=True)
+        return gain[0]
 
 
 
@@ -289,7 +427,7 @@ class Engine:
         temp_board = board.copy()
 
         for i in range(depth):
-            hash = temp_board.board_fen().__hash__()
+            hash = get_hash(temp_board)
             _, tt_move = self.tt.lookup(hash, 0)
 
             if tt_move is None or tt_move not in temp_board.legal_moves:
@@ -303,50 +441,231 @@ class Engine:
 
         return pv
 
+    # Bound type of a score searched in (alpha, beta)
+    def get_bound(self, score, alpha, beta):
+        if score <= alpha:
+            return UPPER
+        if score >= beta:
+            return LOWER
+        return EXACT
+
+    # Bare kings, a single minor, or bishops all on one colour, bitboards only
+    def is_insufficient_material(self, board):
+        if board.pawns | board.rooks | board.queens:
+            return False
+
+        minors = board.knights | board.bishops
+        if not minors & (minors - 1):
+            return True
+
+        return not board.knights and (not board.bishops & chess.BB_DARK_SQUARES or not board.bishops & chess.BB_LIGHT_SQUARES)
+
     def has_non_pawn_material(self, board, color):
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece and piece.color == color and piece.piece_type not in [chess.PAWN, chess.KING]:
-                return True
+        return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
 
-        return False
+    # Polled every 1024 nodes, depth 1 always finishes so there is a move to play
+    def check_time(self):
+        if self.starting_depth > 1:
+            if self.time_manager.out_of_time() or (self.stop_event is not None and self.stop_event.is_set()):
+                raise SearchTimeout()
 
-    # ID best move
-    def get_best_move(self, board, max_depth):
-        print(f"FEN: {board.board_fen()} - " + ("White" if board.turn == chess.WHITE else "Black") + " to move")
-        if settings.USE_BOOK:
-            b = self.book.lookup(board.board_fen().__hash__())
-            if b:
-                return b
+            if self.node_limit is not None and self.total_nodes + self.nodes_searched >= self.node_limit:
+                raise SearchTimeout()
 
-        best_move = None
+    # Pop back to the root after an aborted iteration
+    def unwind(self, board, root_ply):
+        while len(board.move_stack) > root_ply:
+            board.pop()
+        del self.evaluator.stack[1:]
+        del self.hasher.stack[1:]
+
+    # Tt, killers and history carry over between moves of a game, call this between games
+    def new_game(self):
         self.tt.clear()
-        self.killer_moves = {}
-        maximizing = (board.turn == chess.WHITE)
+        self.clear_move_ordering()
+
+        if self.smp:
+            self.smp.new_game()
+
+    # Lazy SMP helper processes sharing the tt, 1 = single process search
+    def set_threads(self, threads):
+        from smp import LazySMP
+
+        if self.smp:
+            self.smp.close()
+            self.smp = None
+
+        if threads > 1:
+            self.smp = LazySMP(self, threads - 1)
+
+    # Resizing drops the tt contents, helpers are restarted on the new table
+    def set_hash(self, size_mb):
+        threads = self.smp.helpers + 1 if self.smp else 1
+        self.set_threads(1)
+        self.tt.resize(size_mb)
+        self.set_threads(threads)
+
+    # ID best move, clock values in ms
+    # With <ponder> the clock is ignored until ponderhit() hands it over
+    def get_best_move(self, board, max_depth=settings.MAX_DEPTH, wtime=None, btime=None, winc=0, binc=0, movestogo=None, movetime=None, nodes=None, ponder=False):
+        if self.verbose:
+            print(f"FEN: {board.board_fen()} - " + ("White" if board.turn == chess.WHITE else "Black") + " to move")
+        self.ponder_move = None
+        self.node_limit = nodes
+
+        if settings.USE_BOOK:
+            book_move = self.book.lookup(board)
+            if book_move:
+                self.total_nodes = 0
+                self.stats.reset()
+                self.stats.fen, self.stats.move = board.fen(), book_move
+                self.stats.finish()
+                return book_move
+
+        # Tablebase position, play the move from the tables without searching
+        if self.tablebase and self.tablebase.can_probe(board):
+            tb_move, wdl = self.tablebase.probe_root(board)
+            if tb_move:
+                self.total_nodes = 0
+                self.stats.reset()
+                score = self.tablebase.get_score(wdl, 0)
+                self.stats.fen, self.stats.move = board.fen(), tb_move
+                self.stats.score = score if board.turn == chess.WHITE else -score
+                self.stats.tb_probes = self.stats.tb_hits = 1
+                self.stats.finish()
+                if self.verbose:
+                    print(f"Tablebase: {tb_move} (wdl {wdl})")
+                return tb_move
+
+        with self.ponder_lock:
+            if ponder and self.pondering:
+                self.time_manager.start(board.turn)
+            elif ponder:
+                self.time_manager.start(board.turn, **self.ponderhit_clock)  # Hit arrived before the search started
+            else:
+                self.time_manager.start(board.turn, wtime, btime, winc, binc, movestogo, movetime)
+
+        self.tt.new_search()  # Older entries stay but age out first
+
+        if self.smp:
+            self.smp.start(board, max_depth)
+
+        if self.profiler:
+            self.profiler.enable()
+
+        best_move, score, depth = self.search(board, max_depth)
 
-        for depth in range(1, max_depth + 1):
+        if self.profiler:
+            self.profiler.disable()
+
+        if self.smp:
+            best_move, score, depth = self.smp.finish(best_move, score, depth, self.total_nodes)
+
+        self.stats.fen = board.fen()
+        self.stats.move, self.stats.score, self.stats.depth, self.stats.nodes = best_move, score, depth, self.total_nodes
+        if settings.STATS_FILE:
+            with open(settings.STATS_FILE, "a") as f:
+                f.write(self.stats.to_json() + "\n")
+
+        if best_move is None:
+            return list(board.legal_moves)[0]
+
+        # Expected reply to search on the opponent's time
+        pv = self.get_pv(board, 2)
+        if len(pv) == 2 and pv[0] == best_move:
+            self.ponder_move = pv[1]
+
+        return best_move
+
+    # Opponent played the pondered move, the running search now goes on the clock
+    def ponderhit(self, wtime=None, btime=None, winc=0, binc=0, movestogo=None, movetime=None):
+        with self.ponder_lock:
+            self.pondering = False
+            self.ponderhit_clock = dict(wtime=wtime, btime=btime, winc=winc, binc=binc, movestogo=movestogo, movetime=movetime)
+            self.time_manager.set_limits(**self.ponderhit_clock)
+
+    # Narrow window around the last iteration's score, widened on fail low/high
+    def aspiration_search(self, board, depth, previous_score):
+        window = settings.ASPIRATION_WINDOW
+
+        if depth < 4 or abs(previous_score) > MATE_BOUND:
+            return self.negamax(board, depth, -math.inf, math.inf)
+
+        alpha = previous_score - window
+        beta = previous_score + window
+
+        while True:
+            score, move = self.negamax(board, depth, alpha, beta)
+
+            if score <= alpha:
+                alpha = score - window if window < 1000 else -math.inf
+            elif score >= beta:
+                beta = score + window if window < 1000 else math.inf
+            else:
+                return score, move
+
+            window *= 4
+
+    # Iterative deepening from <start_depth>, returns move, score and depth of the last completed iteration
+    def search(self, board, max_depth, start_depth=1):
+        best_move = None
+        best_score = 0
+        completed_depth = 0
+        self.total_nodes = 0
+        self.evaluator.reset(board)
+        self.hasher.reset(board)
+        color = 1 if board.turn == chess.WHITE else -1
+        root_ply = len(board.move_stack)
+        last_time = prev_time = 0
+        self.stats.reset()
+        tt_hits, tt_misses = self.tt.hits, self.tt.misses
+
+        for depth in range(start_depth, max_depth + 1):
             self.starting_depth = depth
             self.nodes_searched = 0
             start_time = time.time()
 
             # Actual call
-            score, move = self.minimax(board, depth, -math.inf, math.inf, maximizing)
-            best_move = move
+            try:
+                score, move = self.aspiration_search(board, depth, best_score * color)
+                score *= color  # Reported from white's side
+            except SearchTimeout:
+                self.total_nodes += self.nodes_searched
+                self.unwind(board, root_ply)
+                if self.verbose:
+                    print(f"Stopped at depth {depth} after {self.time_manager.search_elapsed():.2f}s")
+                break
 
-            depth_time = time.time() - start_time
+            self.total_nodes += self.nodes_searched
+            best_move, best_score, completed_depth = move, score, depth
 
-            pv = self.get_pv(board, depth)
-            pv_str = " ".join(str(m) for m in pv)
+            depth_time = time.time() - start_time
+            self.stats.add_iteration(depth, score, self.nodes_searched, depth_time)
 
             # Notes
-            print(f"{depth}: {move} ({score/100:+.2f}) - {self.nodes_searched} nodes @ {self.nodes_searched / depth_time / 1000:.2f} kn/s - pv {pv_str}")
+            if self.info_callback:
+                self.info_callback(depth, score, self.total_nodes, self.time_manager.search_elapsed(), self.get_pv(board, depth))
+
+            if self.verbose:
+                pv = self.get_pv(board, depth)
+                pv_str = " ".join(str(m) for m in pv)
+                print(f"{depth}: {move} ({score/100:+.2f}) - {self.nodes_searched} nodes @ {self.nodes_searched / max(depth_time, 1e-6) / 1000:.2f} kn/s - pv {pv_str}")
 
             # Early stopping if mate found
-            if score >= 99999 or score <= -99999:
-                print(f"Mate found, stopping at depth {depth}")
-                return best_move
+            if abs(score) > MATE_BOUND:
+                if self.verbose:
+                    print(f"Mate found, stopping at depth {depth}")
+                break
 
-        if best_move is None:
-            return list(board.legal_moves)[0]
+            # Only go deeper if the next iteration is predicted to fit in the budget
+            prev_time, last_time = last_time, depth_time
+            if not self.time_manager.can_start_iteration(last_time, prev_time):
+                break
+
+        self.stats.nodes = self.total_nodes
+        self.stats.move, self.stats.score, self.stats.depth = best_move, best_score, completed_depth
+        self.stats.tt_hits = self.tt.hits - tt_hits
+        self.stats.tt_probes = self.stats.tt_hits + self.tt.misses - tt_misses
+        self.stats.finish()
 
-        return best_move
\ No newline at end of file
+        return best_move, best_score, completed_depth
@@ -0,0 +1,141 @@
+import multiprocessing as mp
+import threading
+import time
+import settings
+
+# Worker process: one Engine for the lifetime of the pool, commands come in over <conn>
+def worker_main(conn, threads):
+    from engine import Engine
+
+    engine = Engine()
+    engine.set_threads(threads)
+    engine.stop_event = threading.Event()
+    jobs = []
+    job_ready = threading.Condition()
+
+    # stop / ponderhit have to reach the engine mid-search, so commands are read on their own thread
+    def read_commands():
+        while True:
+            try:
+                command, args = conn.recv()
+            except EOFError:
+                command, args = "quit", None
+
+            if command == "stop":
+                engine.stop_event.set()
+                continue
+
+            if command == "ponderhit":
+                engine.ponderhit(**args)
+                continue
+
+            if command == "new_game":
+                engine.new_game()
+                continue
+
+            # New search, reset the flags here so a quick stop/ponderhit can't be lost
+            if command in ("go", "ponder"):
+                engine.stop_event.clear()
+                engine.pondering = command == "ponder"
+
+            with job_ready:
+                jobs.append((command, args))
+                job_ready.notify()
+
+            if command == "quit":
+                return
+
+    threading.Thread(target=read_commands, daemon=True).start()
+
+    while True:
+        with job_ready:
+            while not jobs:
+                job_ready.wait()
+            command, args = jobs.pop(0)
+
+        if command == "quit":
+            break
+
+        board, clock = args
+        move = engine.get_best_move(board, ponder=command == "ponder", **clock)
+
+        # A ponder search that ran out of depth holds its move until the opponent has moved
+        while engine.pondering and not engine.stop_event.is_set():
+            time.sleep(0.01)
+
+        conn.send((move, engine.ponder_move))
+
+    engine.set_threads(1)
+
+# One process owning an Engine, checked out by a game for its whole lifetime
+class EngineWorker:
+    def __init__(self, threads=1):
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=worker_main, args=(child_conn, threads))
+        self.process.start()
+        self.busy = False
+
+    # Starts a search, result() collects it
+    def go(self, board, **clock):
+        self.conn.send(("go", (board.copy(), clock)))
+        self.busy = True
+
+    # Searches <board> (our move already played plus the expected reply) without a clock
+    def ponder(self, board):
+        self.conn.send(("ponder", (board.copy(), {})))
+        self.busy = True
+
+    def ponderhit(self, **clock):
+        self.conn.send(("ponderhit", clock))
+
+    def stop(self):
+        self.conn.send(("stop", None))
+
+    # Only between searches, the engine otherwise keeps its tt and killers from move to move
+    def new_game(self):
+        self.conn.send(("new_game", None))
+
+    # (best move, expected reply), blocks the calling game thread only
+    def result(self):
+        result = self.conn.recv()
+        self.busy = False
+        return result
+
+    def get_best_move(self, board, **clock):
+        self.go(board, **clock)
+        return self.result()[0]
+
+    # Drop whatever is running, e.g. a ponder search when the game ends
+    def cancel(self):
+        if self.busy:
+            self.stop()
+            self.result()
+
+    def close(self):
+        self.cancel()
+        self.conn.send(("quit", None))
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+# Bounded pool of engine processes, one per concurrent game
+class EnginePool:
+    def __init__(self, size, threads=settings.THREADS):
+        self.lock = threading.Lock()
+        self.free = [EngineWorker(threads) for _ in range(size)]
+
+    # None if every worker is busy
+    def acquire(self):
+        with self.lock:
+            return self.free.pop() if self.free else None
+
+    def release(self, worker):
+        worker.cancel()
+        with self.lock:
+            self.free.append(worker)
+
+    def close(self):
+        with self.lock:
+            for worker in self.free:
+                worker.close()
+            self.free = []
@@ -1,81 +1,32 @@
 import chess
+import importlib
 from numba import njit
 import numpy as np
+import settings
+from pawn_hash_table import PawnHashTable
 
-PIECE_VALUES = {
-    chess.PAWN: 100,
-    chess.KNIGHT: 300,
-    chess.BISHOP: 320,
-    chess.ROOK: 500,
-    chess.QUEEN: 900,
-    chess.KING: 0  # Can't capture
-}
-
-PAWN_TABLE = np.array([
-    0,  0,  0,  0,  0,  0,  0,  0,
-    50, 50, 50, 50, 50, 50, 50, 50,
-    10, 10, 20, 30, 30, 20, 10, 10,
-     5,  5, 10, 25, 25, 10,  5,  5,
-     0,  0,  0, 20, 20, 0,  0,  0,
-     5, -5,-10,  0,  0,-10, -5,  5,
-     5, 10, 10,-20,-20, 10, 10,  5,
-     0,  0,  0,  0,  0,  0,  0,  0
-], dtype=np.int32)
-
-KNIGHT_TABLE = np.array([
-    -50,-40,-30,-30,-30,-30,-40,-50,
-    -40,-20,  0,  0,  0,  0,-20,-40,
-    -30,  0, 10, 15, 15, 10,  0,-30,
-    -30,  5, 15, 20, 20, 15,  5,-30,
-    -30,  0, 15, 20, 20, 15,  0,-30,
-    -30,  5, 10, 15, 15, 10,  5,-30,
-    -40,-20,  0,  5,  5,  0,-20,-40,
-    -50,-40,-30,-30,-30,-30,-40,-50
-], dtype=np.int32)
-
-BISHOP_TABLE = np.array([
-    -20,-10,-10,-10,-10,-10,-10,-20,
-    -10,  0,  0,  0,  0,  0,  0,-10,
-    -10,  0,  5, 10, 10,  5,  0,-10,
-    -10,  5,  5, 10, 10,  5,  5,-10,
-    -10,  0, 10, 10, 10, 10,  0,-10,
-    -10, 10, 10, 10, 10, 10, 10,-10,
-    -10,  5,  0,  0,  0,  0,  5,-10,
-    -20,-10,-10,-10,-10,-10,-10,-20
-], dtype=np.int32)
-
-ROOK_TABLE = np.array([
-     0,  0,  0,  0,  0,  0,  0,  0,
-     5, 10, 10, 10, 10, 10, 10,  5,
-    -5,  0,  0,  0,  0,  0,  0, -5,
-    -5,  0,  0,  0,  0,  0,  0, -5,
-    -5,  0,  0,  0,  0,  0,  0, -5,
-    -5,  0,  0,  0,  0,  0,  0, -5,
-    -5,  0,  0,  0,  0,  0,  0, -5,
-     0,  0,  0,  5,  5,  0,  0,  0
-], dtype=np.int32)
-
-QUEEN_TABLE = np.array([
-    -20,-10,-10, -5, -5,-10,-10,-20,
-    -10,  0,  0,  0,  0,  0,  0,-10,
-    -10,  0,  5,  5,  5,  5,  0,-10,
-     -5,  0,  5,  5,  5,  5,  0, -5,
-      0,  0,  5,  5,  5,  5,  0, -5,
-    -10,  5,  5,  5,  5,  5,  0,-10,
-    -10,  0,  5,  0,  0,  0,  0,-10,
-    -20,-10,-10, -5, -5,-10,-10,-20
-], dtype=np.int32)
-
-KING_TABLE = np.array([
-    -30,-40,-40,-50,-50,-40,-40,-30,
-    -30,-40,-40,-50,-50,-40,-40,-30,
-    -30,-40,-40,-50,-50,-40,-40,-30,
-    -30,-40,-40,-50,-50,-40,-40,-30,
-    -20,-30,-30,-40,-40,-30,-30,-20,
-    -10,-20,-20,-20,-20,-20,-20,-10,
-     20, 20,  0,  0,  0,  0, 20, 20,
-     20, 30, 10,  0,  0, 10, 30, 20
-], dtype=np.int32)
+weights = importlib.import_module(settings.WEIGHTS_MODULE)
+
+PIECE_VALUES = {piece_type: weights.PIECE_VALUES[piece_type] for piece_type in chess.PIECE_TYPES}
+
+PAWN_TABLE = np.array(weights.PAWN_TABLE, dtype=np.int32)
+KNIGHT_TABLE = np.array(weights.KNIGHT_TABLE, dtype=np.int32)
+BISHOP_TABLE = np.array(weights.BISHOP_TABLE, dtype=np.int32)
+ROOK_TABLE = np.array(weights.ROOK_TABLE, dtype=np.int32)
+QUEEN_TABLE = np.array(weights.QUEEN_TABLE, dtype=np.int32)
+KING_TABLE = np.array(weights.KING_TABLE, dtype=np.int32)
+
+DOUBLED_PAWN = weights.DOUBLED_PAWN
+PASSED_PAWN = weights.PASSED_PAWN
+PASSED_PAWN_DISTANCE = weights.PASSED_PAWN_DISTANCE
+KINGSIDE_CASTLING = weights.KINGSIDE_CASTLING
+QUEENSIDE_CASTLING = weights.QUEENSIDE_CASTLING
+SHELTER_KING_FILE = weights.SHELTER_KING_FILE
+SHELTER_ADJACENT_FILE = weights.SHELTER_ADJACENT_FILE
+KING_EXPOSURE = weights.KING_EXPOSURE
+KING_CENTER_FILE = weights.KING_CENTER_FILE
+
+KING_SAFETY_MIN_PIECES = 12  # King safety is skipped at or below this many pieces, activity matters more
 
 PIECE_SQUARE_TABLES = np.array([
     np.zeros(64, dtype=np.int32),
@@ -87,48 +38,272 @@ PIECE_SQUARE_TABLES = np.array([
     KING_TABLE.tolist()
 ])
 
-@njit
-def get_piece_square_table_value(piece_type, square, is_white):
-    if piece_type == 0 or piece_type > 6:
-        return 0
+# Material + pst of every piece on every square, signed from white's view
+# Indexed [color][piece_type][square], plain ints so lookups stay in python
+PIECE_SQUARE_SCORES = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+for _piece_type in chess.PIECE_TYPES:
+    for _square in chess.SQUARES:
+        PIECE_SQUARE_SCORES[chess.WHITE][_piece_type][_square] = PIECE_VALUES[_piece_type] + int(PIECE_SQUARE_TABLES[_piece_type][_square ^ 56])
+        PIECE_SQUARE_SCORES[chess.BLACK][_piece_type][_square] = -(PIECE_VALUES[_piece_type] + int(PIECE_SQUARE_TABLES[_piece_type][_square]))
 
-    table = PIECE_SQUARE_TABLES[piece_type]
+# Pawn-only eval terms cached across nodes
+PAWN_HASH = PawnHashTable(settings.PAWN_HASH_SIZE)
+SHELTER_HASH = PawnHashTable(settings.PAWN_HASH_SIZE)
 
-    if is_white:
-        return table[square ^ 56]
+MATERIAL_VALUES = np.array([PIECE_VALUES.get(piece_type, 0) for piece_type in range(7)], dtype=np.int32)
 
-    else:
-        return table[square]
+# Python ints are unbounded, njit wants int64 so the h8 bit becomes the sign bit
+def to_signed(bb):
+    return bb - 0x10000000000000000 if bb & 0x8000000000000000 else bb
 
 # Eval function in cp
 def get_eval(board):
-    score = 0
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+
+    # Mobility bonus
+    # score += evaluate_mobility(board)
+
+    # Piece-Square table and raw material, pawn structure and king safety in one call
+    return evaluate_bitboards(
+        to_signed(board.pawns), to_signed(board.knights), to_signed(board.bishops),
+        to_signed(board.rooks), to_signed(board.queens), to_signed(board.kings),
+        to_signed(white), to_signed(black), to_signed(board.clean_castling_rights())
+    )
+
+# White-relative evals of many boards in one njit pass
+def get_eval_batch(boards):
+    packed = np.array([
+        (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+         board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.clean_castling_rights())
+        for board in boards
+    ], dtype=np.uint64).reshape(-1, 9)
+
+    return evaluate_batch_kernel(packed.view(np.int64))
+
+# Rows of (pawns, knights, bishops, rooks, queens, kings, white, black, castling rights)
+@njit
+def evaluate_batch_kernel(packed):
+    scores = np.empty(packed.shape[0], dtype=np.int32)
+
+    for i in range(packed.shape[0]):
+        row = packed[i]
+        scores[i] = evaluate_bitboards(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
+
+    return scores
+
+FEN_WIDTH = 96  # Placement, side to move and castling always fit, anything after is ignored
+
+# Streams white-relative evals of fen / epd lines, one array per <batch_size> lines
+# Lines are parsed in njit straight from their bytes, no chess.Board is built
+def get_eval_stream(lines, batch_size=65536):
+    batch = []
+
+    for line in lines:
+        line = line.strip()
+        if line:
+            batch.append(line.encode()[:FEN_WIDTH].ljust(FEN_WIDTH))
+
+        if len(batch) == batch_size:
+            yield evaluate_fen_kernel(np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, FEN_WIDTH))
+            batch = []
 
-    # Piece-Square table and raw material
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
+    if batch:
+        yield evaluate_fen_kernel(np.frombuffer(b"".join(batch), dtype=np.uint8).reshape(-1, FEN_WIDTH))
 
-        if piece:
+def get_eval_fens(lines, batch_size=65536):
+    return np.concatenate(list(get_eval_stream(lines, batch_size)) or [np.empty(0, dtype=np.int32)])
 
-            material_score = PIECE_VALUES[piece.piece_type]
-            pst_score = get_piece_square_table_value(piece.piece_type, square, piece.color == chess.WHITE)
+@njit
+def evaluate_fen_kernel(chars):
+    scores = np.empty(chars.shape[0], dtype=np.int32)
+    bitboards = np.zeros(9, dtype=np.int64)
+
+    for i in range(chars.shape[0]):
+        parse_fen_kernel(chars[i], bitboards)
+        scores[i] = evaluate_bitboards(bitboards[0], bitboards[1], bitboards[2], bitboards[3], bitboards[4],
+                                       bitboards[5], bitboards[6], bitboards[7], bitboards[8])
+
+    return scores
 
-            if piece.color == chess.WHITE:
-                score += material_score + pst_score
+# Placement + castling field into the 9 bitboards get_eval uses, castling rights cleaned like python-chess
+@njit
+def parse_fen_kernel(line, bitboards):
+    bitboards[:] = 0
+    rank = 7
+    file = 0
+    i = 0
+
+    while i < line.shape[0] and line[i] != 32:  # Space
+        c = line[i]
+        i += 1
+
+        if c == 47:  # /
+            rank -= 1
+            file = 0
+        elif 49 <= c <= 56:  # 1-8
+            file += c - 48
+        else:
+            bit = np.int64(1) << np.int64(rank * 8 + file)
+            lower = c | 32
+            if lower == 112:  # p
+                bitboards[0] |= bit
+            elif lower == 110:  # n
+                bitboards[1] |= bit
+            elif lower == 98:  # b
+                bitboards[2] |= bit
+            elif lower == 114:  # r
+                bitboards[3] |= bit
+            elif lower == 113:  # q
+                bitboards[4] |= bit
+            else:  # k
+                bitboards[5] |= bit
+
+            if c < 97:  # Upper case is white
+                bitboards[6] |= bit
             else:
-                score -= material_score + pst_score
+                bitboards[7] |= bit
+            file += 1
+
+    # Skip the side to move
+    i += 1
+    while i < line.shape[0] and line[i] != 32:
+        i += 1
+    i += 1
+
+    white_rooks = bitboards[3] & bitboards[6]
+    black_rooks = bitboards[3] & bitboards[7]
+    white_king_home = ((bitboards[5] & bitboards[6]) >> 4) & 1  # e1
+    black_king_home = ((bitboards[5] & bitboards[7]) >> 60) & 1  # e8
+
+    while i < line.shape[0] and line[i] != 32:
+        c = line[i]
+        i += 1
+        if c == 75 and white_king_home:  # K
+            bitboards[8] |= white_rooks & (np.int64(1) << 7)
+        elif c == 81 and white_king_home:  # Q
+            bitboards[8] |= white_rooks & 1
+        elif c == 107 and black_king_home:  # k
+            bitboards[8] |= black_rooks & (np.int64(1) << 63)
+        elif c == 113 and black_king_home:  # q
+            bitboards[8] |= black_rooks & (np.int64(1) << 56)
+
+def evaluate_material(board):
+    return material_kernel(
+        to_signed(board.pawns), to_signed(board.knights), to_signed(board.bishops),
+        to_signed(board.rooks), to_signed(board.queens), to_signed(board.kings),
+        to_signed(board.occupied_co[chess.WHITE])
+    )
 
-    # Mobility bonus
-    # score += evaluate_mobility(board)
+@njit
+def evaluate_bitboards(pawns, knights, bishops, rooks, queens, kings, white, black, castling_rights):
+    score = material_kernel(pawns, knights, bishops, rooks, queens, kings, white)
+    score += pawn_structure_kernel(pawns & white, pawns & black)
+    score += king_safety_kernel(pawns, kings, white, black, castling_rights)
+    return score
 
-    # Pawn structure bonus
-    score += evaluate_pawn_structure(board)
+@njit
+def material_kernel(pawns, knights, bishops, rooks, queens, kings, white):
+    score = 0
 
-    # King safety bonus
-    score += evaluate_king_safety(board)
+    for square in range(64):
+        if (pawns >> square) & 1:
+            piece_type = 1
+        elif (knights >> square) & 1:
+            piece_type = 2
+        elif (bishops >> square) & 1:
+            piece_type = 3
+        elif (rooks >> square) & 1:
+            piece_type = 4
+        elif (queens >> square) & 1:
+            piece_type = 5
+        elif (kings >> square) & 1:
+            piece_type = 6
+        else:
+            continue
+
+        if (white >> square) & 1:
+            score += MATERIAL_VALUES[piece_type] + PIECE_SQUARE_TABLES[piece_type][square ^ 56]
+        else:
+            score -= MATERIAL_VALUES[piece_type] + PIECE_SQUARE_TABLES[piece_type][square]
 
     return score
 
+@njit
+def popcount(bb):
+    count = 0
+    while bb:
+        bb &= bb - 1
+        count += 1
+    return count
+
+# Squares whose contents can change when <move> is played
+def get_touched_squares(board, move):
+    if not move:
+        return ()
+
+    if board.is_castling(move):
+        # Whole back rank, covers chess960 rook placements too
+        rank = move.from_square & 56
+        return tuple(range(rank, rank + 8))
+
+    if board.is_en_passant(move):
+        return (move.from_square, move.to_square, move.to_square ^ 8)
+
+    return (move.from_square, move.to_square)
+
+# Eval kept up to date by deltas on push/pop instead of rescanning the board
+class IncrementalEvaluator:
+    def __init__(self):
+        self.stack = []  # (material + pst, pawn structure, king safety) per ply
+
+    # Full scan, called once at the root of a search
+    def reset(self, board):
+        self.stack = [(evaluate_material(board), evaluate_pawn_structure(board), evaluate_king_safety(board))]
+
+    # Call with the board already pushed, <before> being the pieces on <squares> prior to the move
+    def push(self, board, squares, before):
+        material, pawn_score, king_score = self.stack[-1]
+
+        pawns_touched = False
+        king_touched = False
+        occupied_before = 0
+        occupied_after = 0
+
+        for square, old_piece in zip(squares, before):
+            new_piece = board.piece_at(square)
+
+            if old_piece == new_piece:
+                continue
+
+            if old_piece:
+                material -= PIECE_SQUARE_SCORES[old_piece.color][old_piece.piece_type][square]
+                pawns_touched |= old_piece.piece_type == chess.PAWN
+                king_touched |= old_piece.piece_type in (chess.KING, chess.ROOK)
+                occupied_before += 1
+
+            if new_piece:
+                material += PIECE_SQUARE_SCORES[new_piece.color][new_piece.piece_type][square]
+                pawns_touched |= new_piece.piece_type == chess.PAWN
+                king_touched |= new_piece.piece_type in (chess.KING, chess.ROOK)
+                occupied_after += 1
+
+        if pawns_touched:
+            pawn_score = evaluate_pawn_structure(board)
+
+        # King safety reads pawns, kings, castling rights (rooks) and piece count
+        if pawns_touched or king_touched or occupied_after < occupied_before:
+            king_score = evaluate_king_safety(board)
+
+        self.stack.append((material, pawn_score, king_score))
+
+    def pop(self):
+        self.stack.pop()
+
+    def get_eval(self):
+        material, pawn_score, king_score = self.stack[-1]
+        return material + pawn_score + king_score
+
 def evaluate_mobility(board):
     score = 0
 
@@ -146,111 +321,187 @@ def evaluate_mobility(board):
     return score
 
 def evaluate_pawn_structure(board):
-    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+    key = (white_pawns, black_pawns)
+
+    score = PAWN_HASH.lookup(key)
+    if score is None:
+        score = pawn_structure_kernel(to_signed(white_pawns), to_signed(black_pawns))
+        PAWN_HASH.store(key, score)
 
+    return score
+
+@njit
+def pawn_structure_kernel(white_pawns, black_pawns):
     if not (white_pawns or black_pawns):
         return 0
 
     score = 0
 
-    # White pawns
-    if white_pawns:
-        file_counts = [0] * 8
-        for square in white_pawns:
-            file_counts[square & 7] += 1
+    # Per file: pawn counts, most advanced black pawn and least advanced white pawn
+    white_counts = np.zeros(8, dtype=np.int32)
+    black_counts = np.zeros(8, dtype=np.int32)
+    black_max_rank = np.full(8, -1, dtype=np.int32)
+    white_min_rank = np.full(8, 8, dtype=np.int32)
 
-        # Doubled pawns only
-        for count in file_counts:
-            if count > 1:
-                score -= 15 * (count - 1)
+    for square in range(64):
+        file, rank = square & 7, square >> 3
 
-        # Passed pawns only
-        for square in white_pawns:
-            file, rank = square & 7, square >> 3
+        if (white_pawns >> square) & 1:
+            white_counts[file] += 1
+            white_min_rank[file] = min(white_min_rank[file], rank)
+
+        elif (black_pawns >> square) & 1:
+            black_counts[file] += 1
+            black_max_rank[file] = max(black_max_rank[file], rank)
+
+    # Doubled pawns only
+    for file in range(8):
+        if white_counts[file] > 1:
+            score -= DOUBLED_PAWN * (white_counts[file] - 1)
+        if black_counts[file] > 1:
+            score += DOUBLED_PAWN * (black_counts[file] - 1)
+
+    # Passed pawns only, no enemy pawn ahead on the same or adjacent files
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        low, high = max(file - 1, 0), min(file + 1, 7)
+
+        if (white_pawns >> square) & 1:
             passed = True
-            for enemy_sq in black_pawns:
-                e_file, e_rank = enemy_sq & 7, enemy_sq >> 3
-                if abs(e_file - file) <= 1 and e_rank > rank:
+            for e_file in range(low, high + 1):
+                if black_max_rank[e_file] > rank:
                     passed = False
-                    break
             if passed:
-                score += 15 + (7 - rank) * 5  # Simple distance bonus
-
-    # Black pawns
-    if black_pawns:
-        file_counts = [0] * 8
-        for square in black_pawns:
-            file_counts[square & 7] += 1
-
-        for count in file_counts:
-            if count > 1:
-                score += 15 * (count - 1)
+                score += PASSED_PAWN + (7 - rank) * PASSED_PAWN_DISTANCE
 
-        for square in black_pawns:
-            file, rank = square & 7, square >> 3
+        elif (black_pawns >> square) & 1:
             passed = True
-            for enemy_sq in white_pawns:
-                e_file, e_rank = enemy_sq & 7, enemy_sq >> 3
-                if abs(e_file - file) <= 1 and e_rank < rank:
+            for e_file in range(low, high + 1):
+                if white_min_rank[e_file] < rank:
                     passed = False
-                    break
             if passed:
-                score -= 15 + rank * 5
+                score -= PASSED_PAWN + rank * PASSED_PAWN_DISTANCE
 
     return score
 
 
 def evaluate_king_safety(board):
     # Skip in endgame when king activity is more important than safety
-    total_pieces = len(board.piece_map())
-    if total_pieces <= 12:
+    if chess.popcount(board.occupied) <= KING_SAFETY_MIN_PIECES:
         return 0
 
-    score = 0
     white_king = board.king(chess.WHITE)
     black_king = board.king(chess.BLACK)
 
     if white_king is None or black_king is None:
         return 0
 
-    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    score = castling_kernel(
+        to_signed(board.kings), to_signed(board.occupied_co[chess.WHITE]),
+        to_signed(board.occupied_co[chess.BLACK]), to_signed(board.clean_castling_rights())
+    )
+
+    # Shelter only depends on pawns and king squares
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+    key = (white_pawns, black_pawns, white_king, black_king)
+
+    shelter = SHELTER_HASH.lookup(key)
+    if shelter is None:
+        shelter = king_shelter_kernel(to_signed(white_pawns), to_signed(black_pawns), white_king, black_king)
+        SHELTER_HASH.store(key, shelter)
+
+    return score + shelter
+
+@njit
+def king_safety_kernel(pawns, kings, white, black, castling_rights):
+    # Skip in endgame when king activity is more important than safety
+    total_pieces = popcount(white | black)
+    if total_pieces <= KING_SAFETY_MIN_PIECES:
+        return 0
+
+    white_king = -1
+    black_king = -1
+
+    # Highest square wins, same as board.king()
+    for square in range(64):
+        if (kings >> square) & 1:
+            if (white >> square) & 1:
+                white_king = square
+            elif (black >> square) & 1:
+                black_king = square
+
+    if white_king < 0 or black_king < 0:
+        return 0
+
+    score = castling_kernel(kings, white, black, castling_rights)
+    score += king_shelter_kernel(pawns & white, pawns & black, white_king, black_king)
+    return score
+
+@njit
+def castling_kernel(kings, white, black, castling_rights):
+    score = 0
+
+    for side in range(2):
+        if side == 0:
+            own, multiplier, back_rank = white, 1, 0
+        else:
+            own, multiplier, back_rank = black, -1, 7
+
+        # Castling rights bonus, a rook right of the back rank king is kingside
+        back_kings = (kings & own) >> (back_rank * 8) & 255
+        if back_kings:
+            back_king_file = 0
+            for file in range(8):
+                if (back_kings >> file) & 1:
+                    back_king_file = file
+            kingside = False
+            queenside = False
+            for file in range(8):
+                if (castling_rights >> (back_rank * 8 + file)) & 1:
+                    if file > back_king_file:
+                        kingside = True
+                    elif file < back_king_file or back_kings != (1 << file):
+                        queenside = True
+            if kingside:
+                score += multiplier * KINGSIDE_CASTLING
+            if queenside:
+                score += multiplier * QUEENSIDE_CASTLING
+
+    return score
+
+@njit
+def king_shelter_kernel(white_pawns, black_pawns, white_king, black_king):
+    score = 0
 
     # Evaluate both kings
-    for king_sq, color, pawns, multiplier in [
-        (white_king, chess.WHITE, white_pawns, 1),
-        (black_king, chess.BLACK, black_pawns, -1)
-    ]:
-        king_file, king_rank = king_sq & 7, king_sq >> 3
+    for side in range(2):
+        if side == 0:
+            king_sq, own_pawns, multiplier = white_king, white_pawns, 1
+        else:
+            king_sq, own_pawns, multiplier = black_king, black_pawns, -1
 
-        # Castling rights bonus
-        if board.has_kingside_castling_rights(color):
-            score += multiplier * 15
-        if board.has_queenside_castling_rights(color):
-            score += multiplier * 10
+        king_file, king_rank = king_sq & 7, king_sq >> 3
 
         # Pawn shelter - check king file and adjacent files
-        for check_file in [king_file - 1, king_file, king_file + 1]:
+        # Good shelter ranks: 1-2 for white, 5-6 for black
+        low_rank = 1 if side == 0 else 5
+        for check_file in range(king_file - 1, king_file + 2):
             if 0 <= check_file <= 7:
-                for pawn_sq in pawns:
-                    pawn_file, pawn_rank = pawn_sq & 7, pawn_sq >> 3
-                    if pawn_file == check_file:
-                        # Good shelter ranks: 1-2 for white, 5-6 for black
-                        if (color == chess.WHITE and 1 <= pawn_rank <= 2) or \
-                                (color == chess.BLACK and 5 <= pawn_rank <= 6):
-                            bonus = 12 if check_file == king_file else 8
-                            score += multiplier * bonus
-                            break
+                if ((own_pawns >> (low_rank * 8 + check_file)) & 1) or ((own_pawns >> ((low_rank + 1) * 8 + check_file)) & 1):
+                    bonus = SHELTER_KING_FILE if check_file == king_file else SHELTER_ADJACENT_FILE
+                    score += multiplier * bonus
 
         # King exposure penalties
-        if color == chess.WHITE and king_rank > 2:
-            score += multiplier * (-(king_rank - 2) * 8)
-        elif color == chess.BLACK and king_rank < 5:
-            score += multiplier * (-(5 - king_rank) * 8)
+        if side == 0 and king_rank > 2:
+            score += multiplier * (-(king_rank - 2) * KING_EXPOSURE)
+        elif side == 1 and king_rank < 5:
+            score += multiplier * (-(5 - king_rank) * KING_EXPOSURE)
 
         # Center file penalty
         if 2 <= king_file <= 5:
-            score += multiplier * (-10)
+            score += multiplier * (-KING_CENTER_FILE)
 
-    return score
\ No newline at end of file
+    return score
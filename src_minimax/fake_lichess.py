@@ -0,0 +1,129 @@
+import chess
+import queue
+import random
+import threading
+
+# Local stand-in for the parts of berserk.Client the bot uses, the opponent plays random moves
+class FakeClient:
+    def __init__(self, challenges, max_plies=20, clock_ms=5000):
+        self.bots = FakeBots(self, challenges, max_plies, clock_ms)
+        self.account = FakeAccount()
+
+class FakeAccount:
+    def get(self):
+        return {"id": "fake_bot"}
+
+class FakeGame:
+    def __init__(self, game_id, bot_color, clock_ms):
+        self.id = game_id
+        self.board = chess.Board()
+        self.bot_color = bot_color
+        self.clock_ms = clock_ms
+        self.states = queue.Queue()
+        self.status = "started"
+
+    def state(self):
+        return {
+            "type": "gameState",
+            "moves": " ".join(move.uci() for move in self.board.move_stack),
+            "wtime": self.clock_ms,
+            "btime": self.clock_ms,
+            "winc": 0,
+            "binc": 0,
+            "status": self.status,
+        }
+
+    # Random reply, or close the game once it's over or long enough
+    def opponent_move(self, max_plies):
+        if not self.board.is_game_over() and len(self.board.move_stack) < max_plies:
+            self.board.push(random.choice(list(self.board.legal_moves)))
+
+        if self.board.is_checkmate():
+            self.status = "mate"
+        elif self.board.is_game_over():
+            self.status = "draw"
+        elif len(self.board.move_stack) >= max_plies:
+            self.status = "resign"
+
+        self.states.put(self.state())
+
+class FakeBots:
+    def __init__(self, client, challenges, max_plies, clock_ms):
+        self.challenges = challenges  # (challenger name, speed)
+        self.max_plies = max_plies
+        self.clock_ms = clock_ms
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.games = {}
+        self.answered = 0
+        self.accepted = []
+        self.declined = []  # (challenge id, reason)
+        self.messages = []  # (game id, text)
+
+        for i, (name, speed) in enumerate(challenges):
+            self.events.put({"type": "challenge", "challenge": {"id": f"c{i}", "challenger": {"name": name}, "speed": speed}})
+
+    def stream_incoming_events(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            yield event
+
+    def answer(self):
+        self.answered += 1
+        if self.answered == len(self.challenges):
+            self.events.put(None)  # End of the stream once everything is answered
+
+    def accept_challenge(self, challenge_id):
+        with self.lock:
+            game_id = f"g{challenge_id}"
+            self.games[game_id] = FakeGame(game_id, random.choice(chess.COLORS), self.clock_ms)
+            self.accepted.append(challenge_id)
+            self.events.put({"type": "gameStart", "game": {"id": game_id}})
+            self.answer()
+
+    def decline_challenge(self, challenge_id, reason="generic"):
+        with self.lock:
+            self.declined.append((challenge_id, reason))
+            self.answer()
+
+    def stream_game_state(self, game_id):
+        game = self.games[game_id]
+        white_id = "fake_bot" if game.bot_color == chess.WHITE else "opponent"
+
+        yield {"type": "gameFull", "white": {"id": white_id}, "initialFen": "startpos", "state": game.state()}
+
+        if game.bot_color == chess.BLACK:
+            game.opponent_move(self.max_plies)
+
+        while True:
+            state = game.states.get()
+            yield state
+            if state["status"] != "started":
+                return
+
+    def make_move(self, game_id, move):
+        game = self.games[game_id]
+        game.board.push(chess.Move.from_uci(str(move)))
+        game.opponent_move(self.max_plies)
+
+    def post_message(self, game_id, text):
+        self.messages.append((game_id, text))
+
+
+# Runs the bot runtime against fake challenges, no network needed
+if __name__ == "__main__":
+    from main import Bot
+
+    client = FakeClient([("alice", "blitz"), ("bob", "rapid"), ("carol", "bullet"), ("dave", "correspondence")], max_plies=10)
+    bot = Bot(client, max_games=2)
+
+    bot.listen()
+    bot.wait()
+    bot.close()
+
+    print(f"Accepted: {client.bots.accepted}")
+    print(f"Declined: {client.bots.declined}")
+    for game in client.bots.games.values():
+        print(f"{game.id}: {game.status} - {' '.join(move.uci() for move in game.board.move_stack)}")
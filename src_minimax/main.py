@@ -1,13 +1,13 @@
 import berserk
 import chess
-import requests
+import datetime
+import threading
 import time
 import settings
-from engine import Engine
+from engine_pool import EnginePool
 
 session = berserk.TokenSession(token=settings.API_KEY)
 client = berserk.Client(session=session)
-engine = Engine()
 
 def send_challenge():
     challenge = client.challenges.create(
@@ -23,124 +23,236 @@ def send_challenge():
 
     return challenge
 
-# Handling state updates for game <game_id>
-def play_game(game_id):
-    board = chess.Board()
-    bot_color = None
-    last_move_count = 0
-
-    # Event loop
-    for event in client.bots.stream_game_state(game_id):
-
-        # Start of game
-        if event["type"] == "gameFull":
-            state = event["state"]
-
-            # Store bot color
-            white_id = event["white"]["id"].lower()
-            bot_id = client.account.get()["id"].lower()
-
-            bot_color = "white" if white_id == bot_id else "black"
-
-            # Custom fen handling
-            initial_fen = event.get("initialFen")
-            if initial_fen and initial_fen != "startpos":
-                board = chess.Board(fen=initial_fen)
-
-        # Ingame update (after move, etc.)
-        elif event["type"] == "gameState":
-            state = event
-
-        moves = state.get("moves", "").split()  # Uci format
-
-        # Check if lichess is being annoying w/ turns
-        if last_move_count == len(moves) and len(moves) != 0:
-            continue
-
-        if hasattr(play_game, "initial_board"):
-            board = play_game.initial_board.copy()
-        else:
-            play_game.initial_board = board.copy()
-
-        # Replay all moves from the game from fresh position
-        for move in moves:
-            try:
-                board.push_uci(move)
-            except:
-                pass  # Illegal move fallback
-
-        # Only move if engine's turn
-        if (board.turn == chess.WHITE and bot_color != "white") or (board.turn == chess.BLACK and bot_color != "black"):
-            continue
-
-        # Check game over
-        status = state.get("status", "started")
-        if status != "started":
-            send_message(game_id, settings.END_MSG)
-            print(f"--> Game Over: {status}")
+# Clock value from a game state in ms, berserk hands these out as ints, timedeltas or datetimes depending on version
+def get_clock_ms(value):
+    if value is None:
+        return None
+
+    if isinstance(value, datetime.timedelta):
+        return int(value.total_seconds() * 1000)
+
+    if isinstance(value, datetime.datetime):
+        return int(value.replace(tzinfo=value.tzinfo or datetime.timezone.utc).timestamp() * 1000)
+
+    return int(value)
+
+# Runs any number of games at once, one thread per game stream and one engine process per game
+class Bot:
+    def __init__(self, client, max_games=settings.MAX_GAMES):
+        self.client = client
+        self.max_games = max_games
+        self.pool = EnginePool(max_games)
+        self.lock = threading.Lock()
+        self.games = {}  # game_id -> thread
+        self.accepted = 0  # Accepted challenges whose game hasn't started yet
+        self.bot_id = None
+
+    def get_bot_id(self):
+        if self.bot_id is None:
+            self.bot_id = self.client.account.get()["id"].lower()
+
+        return self.bot_id
+
+    # Listening loop
+    def listen(self):
+        print("Awaiting...")
+
+        for event in self.client.bots.stream_incoming_events():
+            # On challenge
+            if event["type"] == "challenge":
+                self.handle_challenge(event["challenge"])
+
+            # On game start
+            elif event["type"] == "gameStart":
+                self.start_game(event["game"]["id"])
+
+    def handle_challenge(self, challenge):
+        challenger = challenge["challenger"]["name"]
+        print(f"Challenge received from account <{challenger}>")
+
+        if challenge["speed"] not in ["classical", "rapid", "blitz", "bullet"]:
+            print(challenge["speed"])
+            self.client.bots.decline_challenge(challenge["id"], reason="timeControl")
+            print(f"--> Declined challenge from <{challenger}>")
             return
 
-        # Make random move for now
-        legal_moves = list(board.legal_moves)
-        if legal_moves:
-            move = engine.get_best_move(board, 3)
-            print(f"--> Playing move <{move}>")
-            client.bots.make_move(game_id, move)
-            last_move_count = len(legal_moves) + 1
-            time.sleep(0.5)  # Sry servers :(
+        with self.lock:
+            full = len(self.games) + self.accepted >= self.max_games
+            if not full:
+                self.accepted += 1
+
+        if full:
+            self.client.bots.decline_challenge(challenge["id"], reason="later")
+            print(f"--> Declined challenge from <{challenger}> (busy)")
+            return
+
+        self.client.bots.accept_challenge(challenge["id"])
+        print(f"--> Accepted challenge from <{challenger}>")
+
+    def start_game(self, game_id):
+        print(f"--> Game started <{game_id}>")
+
+        with self.lock:
+            if game_id in self.games:
+                return
+
+            self.accepted = max(self.accepted - 1, 0)
+            thread = threading.Thread(target=self.run_game, args=(game_id,), daemon=True)
+            self.games[game_id] = thread
+
+        thread.start()
+
+    def run_game(self, game_id):
+        worker = self.pool.acquire()
+
+        try:
+            if worker is None:
+                print(f"ERROR: no engine free for <{game_id}>")
+                return
+
+            worker.new_game()
+            self.send_message(game_id, settings.WELCOME_MSG)
+            self.play_game(game_id, worker)
+
+        except Exception as e:
+            print(f"ERROR: {e}")
+
+        finally:
+            if worker is not None:
+                self.pool.release(worker)
 
+            with self.lock:
+                self.games.pop(game_id, None)
 
-# Sends some message <msg> to game <game_id>
-def send_message(game_id, msg):
-    url = f"https://lichess.org/api/bot/game/{game_id}/chat"
-    headers = {
-        "Authorization": f"Bearer {settings.API_KEY}",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-    data = {
-        "room": "player",
-        "text": msg
-    }
-    res = requests.post(url, headers=headers, data=data)
-    if res.status_code != 200:
-        print(f"Failed to send message: {res.status_code} - {res.text}")
-
-# Listening loop
-def listen():
-    print("Awaiting...")
-
-    for event in client.bots.stream_incoming_events():
-        # On challenge
-        if event["type"] == "challenge":
-
-            challenge = event["challenge"]
-            challenger = challenge["challenger"]["name"]
-            print(f"Challenge received from account <{challenger}>")
-
-            if challenge["speed"] in ["classical", "rapid", "blitz", "bullet"]:
-                client.bots.accept_challenge(challenge["id"])
-                print(f"--> Accepted challenge from <{challenger}>")
+    # Handling state updates for game <game_id>
+    def play_game(self, game_id, worker):
+        initial_board = chess.Board()
+        bot_color = None
+        searched_move_count = None
+        ponder_move = None  # Reply being pondered on the worker
+        ponder_ply = 0
+
+        # Event loop
+        for event in self.client.bots.stream_game_state(game_id):
+
+            # Start of game
+            if event["type"] == "gameFull":
+                state = event["state"]
+
+                # Store bot color
+                white_id = event["white"]["id"].lower()
+                bot_color = chess.WHITE if white_id == self.get_bot_id() else chess.BLACK
+
+                # Custom fen handling
+                initial_fen = event.get("initialFen")
+                if initial_fen and initial_fen != "startpos":
+                    initial_board = chess.Board(fen=initial_fen)
+
+            # Ingame update (after move, etc.)
+            elif event["type"] == "gameState":
+                state = event
 
             else:
-                print(challenge["speed"])
-                client.bots.decline_challenge(challenge["id"], reason="timeControl")
-                print(f"--> Declined challenge from <{challenger}>")
+                continue
+
+            # Check game over
+            status = state.get("status", "started")
+            if status != "started":
+                self.send_message(game_id, settings.END_MSG)
+                print(f"--> Game Over <{game_id}>: {status}")
+                return
+
+            moves = state.get("moves", "").split()  # Uci format
+
+            # Check if lichess is being annoying w/ turns (repeated state for a position we already moved in)
+            if searched_move_count == len(moves):
+                continue
+
+            # Replay all moves from the game from fresh position
+            board = initial_board.copy()
+            for move in moves:
+                try:
+                    board.push_uci(move)
+                except ValueError:
+                    pass  # Illegal move fallback
+
+            # Only move if engine's turn
+            if board.turn != bot_color or board.is_game_over():
+                continue
+
+            searched_move_count = len(moves)
+            clock = dict(
+                wtime=get_clock_ms(state.get("wtime")),
+                btime=get_clock_ms(state.get("btime")),
+                winc=get_clock_ms(state.get("winc")) or 0,
+                binc=get_clock_ms(state.get("binc")) or 0
+            )
+
+            # Ponder hit keeps the running search and its work, a miss throws it away
+            result = None
+            if ponder_move is not None:
+                if len(moves) == ponder_ply and moves[-1] == ponder_move.uci():
+                    print(f"--> Ponder hit <{ponder_move}> in <{game_id}>")
+                    worker.ponderhit(**clock)
+                    result = worker.result()
+                else:
+                    worker.cancel()
 
-        # On game start
-        elif event["type"] == "gameStart":
-            print("--> Game started")
-            game_id = event["game"]["id"]
-            send_message(game_id, settings.WELCOME_MSG)
+                ponder_move = None
 
-            # Loop
-            try:
-                play_game(game_id)
+            if result is None:
+                worker.go(board, **clock)
+                result = worker.result()
 
-            except Exception as e:
-                print(f"ERROR: {e}")
+            move, ponder_move = result
+            print(f"--> Playing move <{move}> in <{game_id}>")
+            self.client.bots.make_move(game_id, move)
+
+            # Search the expected reply on the opponent's time
+            if settings.PONDER and ponder_move is not None:
+                ponder_board = board.copy()
+                ponder_board.push(chess.Move.from_uci(str(move)))
+                ponder_board.push(ponder_move)
+                ponder_ply = len(ponder_board.move_stack) - len(initial_board.move_stack)
+
+                if ponder_board.is_game_over():
+                    ponder_move = None
+                else:
+                    worker.ponder(ponder_board)
+            else:
+                ponder_move = None
+
+            time.sleep(0.5)  # Sry servers :(
+
+    # Sends some message <msg> to game <game_id>
+    def send_message(self, game_id, msg):
+        try:
+            self.client.bots.post_message(game_id, msg)
+        except Exception as e:
+            print(f"Failed to send message: {e}")
+
+    # Blocks until every running game has finished
+    def wait(self):
+        while True:
+            with self.lock:
+                threads = list(self.games.values())
+
+            if not threads:
+                return
+
+            for thread in threads:
+                thread.join()
+
+    def close(self):
+        self.pool.close()
 
 
 if __name__ == "__main__":
     if settings.AUTO_CHALLENGE:
         send_challenge()
-    listen()
+
+    bot = Bot(client)
+    try:
+        bot.listen()
+    finally:
+        bot.close()
@@ -0,0 +1,174 @@
+import argparse
+import chess
+import chess.pgn
+import math
+import multiprocessing as mp
+import time
+import settings
+from bench import BENCH_FENS
+
+# Offline matches between two engine configurations, e.g. checking nmp / lmr / tt size changes without lichess
+# python match.py --games 40 --nodes 20000 --a lmr=0 --b lmr=1 --pgn match.pgn
+
+# Engine attributes a configuration can set, "hash" resizes the tt (MB)
+OPTIONS = {"null_move": bool, "lmr": bool, "quiescence_cap": int, "hash": int}
+
+# "lmr=0,hash=16" -> {"lmr": False, "hash": 16}
+def parse_config(text):
+    config = {}
+    for option in filter(None, text.split(",")):
+        name, value = option.split("=")
+        config[name] = OPTIONS[name](int(value))
+
+    return config
+
+def make_engine(config):
+    from engine import Engine
+
+    engine = Engine()
+    engine.verbose = False
+
+    for name, value in config.items():
+        if name == "hash":
+            engine.set_hash(value)
+        else:
+            setattr(engine, name, value)
+
+    return engine
+
+# One game from <fen>, limits are depth / nodes / movetime (ms) per move or a clock as (base ms, inc ms)
+# Returns the pgn text and the result from engine A's side (1, 0.5, 0)
+def play_game(job):
+    index, fen, a_is_white, config_a, config_b, limits, max_plies = job
+    board = chess.Board(fen)
+    engines = {a_is_white: make_engine(config_a), not a_is_white: make_engine(config_b)}
+    clock = limits.get("clock")
+    times = {chess.WHITE: clock[0], chess.BLACK: clock[0]} if clock else None
+    result = None
+
+    while result is None:
+        if board.is_game_over(claim_draw=True):
+            result = board.result(claim_draw=True)
+            break
+
+        if len(board.move_stack) >= max_plies:
+            result = "1/2-1/2"  # Adjudicated
+            break
+
+        search_limits = {"max_depth": limits.get("depth") or settings.MAX_DEPTH, "nodes": limits.get("nodes"), "movetime": limits.get("movetime")}
+        if clock:
+            search_limits.update(wtime=times[chess.WHITE], btime=times[chess.BLACK], winc=clock[1], binc=clock[1])
+
+        start = time.time()
+        move = engines[board.turn].get_best_move(board, **search_limits)
+
+        if clock:
+            times[board.turn] -= int((time.time() - start) * 1000)
+            if times[board.turn] < 0:
+                result = "0-1" if board.turn == chess.WHITE else "1-0"
+                break
+            times[board.turn] += clock[1]
+
+        board.push(move)
+
+    for engine in engines.values():
+        engine.tt.close()
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "XCCE match"
+    game.headers["Round"] = str(index + 1)
+    game.headers["White"] = "A" if a_is_white else "B"
+    game.headers["Black"] = "B" if a_is_white else "A"
+    game.headers["Result"] = result
+
+    score = {"1-0": 1, "0-1": 0, "1/2-1/2": 0.5}[result]
+    return str(game), score if a_is_white else 1 - score
+
+# Elo difference and its 95% error margin from A's wins / draws / losses
+def get_elo(wins, draws, losses):
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    if score in (0, 1):
+        return math.copysign(math.inf, score - 0.5), math.inf
+
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    elo = lambda s: 400 * math.log10(s / (1 - s))
+    return elo(score), (elo(min(score + margin, 0.999)) - elo(max(score - margin, 0.001))) / 2
+
+# Log likelihood ratio of elo1 over elo0 (normal approximation) with the stopping bounds for alpha / beta
+def get_sprt(wins, draws, losses, elo0=0, elo1=5, alpha=0.05, beta=0.05):
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    if variance == 0:
+        return 0, lower, upper
+
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr = games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+    return llr, lower, upper
+
+def run_match(config_a, config_b, openings, games, limits, processes, max_plies=200, pgn_path=None, elo0=0, elo1=5):
+    # Each opening twice with colours swapped, cycling through the suite
+    jobs = [(i, openings[(i // 2) % len(openings)], i % 2 == 0, config_a, config_b, limits, max_plies) for i in range(games)]
+    wins = draws = losses = 0
+    pgn = open(pgn_path, "w") if pgn_path else None
+
+    with mp.Pool(processes) as pool:
+        for game, score in pool.imap_unordered(play_game, jobs):
+            wins += score == 1
+            draws += score == 0.5
+            losses += score == 0
+
+            if pgn:
+                pgn.write(game + "\n\n")
+                pgn.flush()
+
+            elo, margin = get_elo(wins, draws, losses)
+            llr, lower, upper = get_sprt(wins, draws, losses, elo0, elo1)
+            print(f"{wins + draws + losses}/{games}: +{wins} ={draws} -{losses}, elo {elo:+.1f} +/- {margin:.1f}, llr {llr:.2f} ({lower:.2f}, {upper:.2f})")
+
+    if pgn:
+        pgn.close()
+
+    return wins, draws, losses
+
+# Suite file: one fen / epd per line
+def load_openings(path):
+    with open(path) as f:
+        return [chess.Board(" ".join(line.split()[:4]) + " 0 1").fen() for line in f if line.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--a", default="", help="engine A options, e.g. lmr=0,hash=16")
+    parser.add_argument("--b", default="", help="engine B options")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--openings", help="fen / epd file, defaults to the bench openings")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--nodes", type=int)
+    parser.add_argument("--movetime", type=int, help="ms per move")
+    parser.add_argument("--tc", help="clock as base+inc in seconds, e.g. 10+0.1")
+    parser.add_argument("--processes", type=int, default=mp.cpu_count())
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--pgn")
+    parser.add_argument("--elo0", type=float, default=0)
+    parser.add_argument("--elo1", type=float, default=5)
+    args = parser.parse_args()
+
+    limits = {"depth": args.depth, "nodes": args.nodes, "movetime": args.movetime}
+    if args.tc:
+        base, inc = args.tc.split("+") if "+" in args.tc else (args.tc, 0)
+        limits["clock"] = (int(float(base) * 1000), int(float(inc) * 1000))
+    if not any(limits.values()):
+        limits["nodes"] = 20000
+
+    openings = load_openings(args.openings) if args.openings else BENCH_FENS[:10]
+
+    run_match(parse_config(args.a), parse_config(args.b), openings, args.games, limits, args.processes,
+              args.max_plies, args.pgn, args.elo0, args.elo1)
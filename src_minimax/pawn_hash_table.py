@@ -0,0 +1,41 @@
+# Direct mapped cache for eval terms that only depend on pawns (and king squares)
+class PawnHashTable:
+    def __init__(self, size=16384):
+        self.bits = max(1, size.bit_length() - 1)  # Rounded down to a power of 2
+        self.size = 1 << self.bits
+        self.clear()
+
+    # Fibonacci hashing, python's tuple hash leaves the low bits poorly spread for bitboards
+    def get_index(self, key):
+        return ((hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.bits)
+
+    def lookup(self, key):
+        index = self.get_index(key)
+
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+
+        self.misses += 1
+        return None
+
+    # Colliding entries are simply overwritten
+    def store(self, key, value):
+        index = self.get_index(key)
+
+        if self.keys[index] is not None:
+            self.evictions += 1
+
+        self.keys[index] = key
+        self.values[index] = value
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.values = [0] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -0,0 +1,76 @@
+import json
+import time
+
+# Counters for one search, filled in by the engine and read back through to_dict() / to_json()
+class SearchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.start_time = time.time()
+        self.time = 0  # Seconds, set by finish() when the search ends
+        self.fen = None
+        self.move = None
+        self.score = None
+        self.depth = 0
+        self.nodes = 0  # Every negamax + quiescence node, helpers included with lazy smp
+        self.qnodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0  # Beta cutoffs on the first move searched, a measure of move ordering
+        self.eval_calls = 0  # Evals read by the search
+        self.eval_updates = 0  # Incremental eval updates, one per push
+        self.eval_update_time = 0
+        self.tb_probes = 0
+        self.tb_hits = 0
+        self.iterations = []  # (depth, score, nodes, seconds) per completed iteration
+
+    # Freezes the elapsed time so to_dict() gives the same numbers whenever it's read
+    def finish(self):
+        self.time = time.time() - self.start_time
+
+    def add_iteration(self, depth, score, nodes, seconds):
+        self.iterations.append((depth, score, nodes, seconds))
+
+    # Growth in nodes per extra ply, geometric mean over the completed iterations
+    def get_branching_factor(self):
+        if len(self.iterations) < 2 or self.iterations[0][2] == 0:
+            return None
+
+        first_nodes = self.iterations[0][2]
+        last_nodes = self.iterations[-1][2]
+        return (last_nodes / first_nodes) ** (1 / (len(self.iterations) - 1))
+
+    def to_dict(self):
+        branching = self.get_branching_factor()
+
+        return {
+            "fen": self.fen,
+            "move": str(self.move) if self.move else None,
+            "score": self.score,
+            "depth": self.depth,
+            "time": round(self.time, 4),
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "nps": int(self.nodes / max(self.time, 1e-6)),
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": round(self.tt_hits / self.tt_probes, 4) if self.tt_probes else 0,
+            "tt_cutoffs": self.tt_cutoffs,
+            "beta_cutoffs": self.beta_cutoffs,
+            "first_move_cutoff_rate": round(self.first_move_cutoffs / self.beta_cutoffs, 4) if self.beta_cutoffs else 0,
+            "eval_calls": self.eval_calls,
+            "eval_updates": self.eval_updates,
+            "eval_update_time": round(self.eval_update_time, 4),
+            "eval_update_us": round(self.eval_update_time * 1e6 / self.eval_updates, 2) if self.eval_updates else 0,
+            "tb_probes": self.tb_probes,
+            "tb_hits": self.tb_hits,
+            "iterations": [{"depth": d, "score": s, "nodes": n, "time": round(t, 4)} for d, s, n, t in self.iterations],
+            "ebf": round(branching, 3) if branching else None,
+        }
+
+    # One line per search, for appending to a .jsonl log
+    def to_json(self):
+        return json.dumps(self.to_dict())
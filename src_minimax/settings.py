@@ -8,7 +8,31 @@ END_MSG = "Good Game!"  # Message sent on game over
 # Challenge
 AUTO_CHALLENGE = False
 CHALLENGE_USER = "TfXD"
+MAX_GAMES = 2  # Concurrent games, challenges past this are declined with "later"
 
 # Misc
 
 USE_BOOK = False
+BOOK_FILE = None  # Polyglot .bin book, e.g. "books/performance.bin", the built-in lines are the fallback
+BOOK_MAX_PLY = 20  # Book moves only up to this ply of the game
+TT_SIZE_MB = 64  # Transposition table memory budget
+PAWN_HASH_SIZE = 16384  # Entries in the pawn structure / king shelter caches
+WEIGHTS_MODULE = "weights"  # Eval weights, e.g. a module written by tuner.py
+
+# Search
+MAX_DEPTH = 64  # Iterative deepening cap when searching on the clock
+MOVE_OVERHEAD_MS = 300  # Kept back per move for network lag
+THREADS = 1  # Search processes, > 1 enables lazy SMP
+PONDER = True  # Keep searching the expected reply on the opponent's time
+ASPIRATION_WINDOW = 50  # cp either side of the last iteration's score
+NULL_MOVE = True  # Null move pruning, off in pawn-only endgames (zugzwang)
+NULL_MOVE_R = 2  # Depth reduction of the null move search
+LMR = True  # Late move reductions for quiet moves
+LMR_FULL_MOVES = 3  # Moves searched at full depth before reducing
+LMR_MIN_DEPTH = 3
+SYZYGY_PATH = None  # Directory of syzygy .rtbw / .rtbz files, None disables probing
+SYZYGY_PIECES = 5  # Probe positions with at most this many pieces (kings included)
+
+# Stats
+STATS_FILE = None  # Path to append one json line of search stats per move to, e.g. "stats.jsonl"
+PROFILE = False  # cProfile every search, read back from Engine.profiler
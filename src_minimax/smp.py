@@ -0,0 +1,104 @@
+import chess
+import multiprocessing as mp
+import queue
+import time
+from engine import Engine
+from transposition_table import TranspositionTable
+
+# Helper process: searches every root it's sent into the shared tt until told to stop
+def helper_loop(index, tt_name, tt_size_mb, jobs, results, stop_event):
+    engine = Engine()
+    engine.tt = TranspositionTable(tt_size_mb, name=tt_name)
+    engine.stop_event = stop_event
+    engine.shuffle_root = True
+    engine.verbose = False
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        if job == "new_game":
+            engine.clear_move_ordering()
+            continue
+
+        board, max_depth, age = job
+        engine.tt.age = age
+        engine.time_manager.start(board.turn)  # No clock, runs until stopped
+
+        # Half the helpers run one ply ahead of the main search
+        move, score, depth = engine.search(board, max_depth, start_depth=1 + index % 2)
+        results.put((index, move.uci() if move else None, score, depth, engine.total_nodes))
+
+    engine.tt.close()
+
+# Lazy SMP: helpers search the same root with varied depths and root orders, only sharing the tt
+class LazySMP:
+    def __init__(self, engine, helpers):
+        self.engine = engine
+        self.helpers = helpers
+        self.start_time = 0
+
+        # Main search moves onto a shared tt of the same size
+        size_mb = engine.tt.size_mb
+        engine.tt.close()
+        engine.tt = TranspositionTable(size_mb, shared=True)
+
+        self.stop_event = mp.Event()
+        self.results = mp.Queue()
+        self.jobs = [mp.Queue() for _ in range(helpers)]
+        self.processes = [
+            mp.Process(target=helper_loop, args=(i + 1, engine.tt.get_name(), engine.tt.size_mb, self.jobs[i], self.results, self.stop_event), daemon=True)
+            for i in range(helpers)
+        ]
+
+        for process in self.processes:
+            process.start()
+
+    def start(self, board, max_depth):
+        self.stop_event.clear()
+        self.start_time = time.time()
+
+        for jobs in self.jobs:
+            jobs.put((board.copy(), max_depth, self.engine.tt.age))
+
+    # The shared tt is cleared by the main engine
+    def new_game(self):
+        for jobs in self.jobs:
+            jobs.put("new_game")
+
+    # Stops the helpers and keeps the deepest completed result, the main search wins ties
+    def finish(self, move, score, depth, nodes):
+        self.stop_event.set()
+
+        total_nodes = nodes
+        for _ in range(self.helpers):
+            try:
+                index, helper_move, helper_score, helper_depth, helper_nodes = self.results.get(timeout=10)
+            except queue.Empty:
+                break
+
+            total_nodes += helper_nodes
+            if helper_move and helper_depth > depth:
+                move, score, depth = chess.Move.from_uci(helper_move), helper_score, helper_depth
+
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        if self.engine.verbose:
+            print(f"SMP: {self.helpers + 1} threads, depth {depth} - {total_nodes} nodes @ {total_nodes / elapsed / 1000:.2f} kn/s")
+
+        self.engine.total_nodes = total_nodes
+        return move, score, depth
+
+    def close(self):
+        for jobs in self.jobs:
+            jobs.put(None)
+
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        # Back to a private tt
+        size_mb = self.engine.tt.size_mb
+        self.engine.tt.close()
+        self.engine.tt = TranspositionTable(size_mb)
@@ -0,0 +1,78 @@
+import chess
+import chess.syzygy
+from pawn_hash_table import PawnHashTable
+from transposition_table import TB_WIN
+
+# Syzygy probing from a local directory, wdl results are cached by zobrist key
+class Tablebase:
+    def __init__(self, path, max_pieces=5, cache_size=65536):
+        self.tablebase = chess.syzygy.open_tablebase(path)
+        self.max_pieces = max_pieces
+        self.cache = PawnHashTable(cache_size)  # Same direct mapped cache the eval uses
+        self.probes = 0
+        self.hits = 0  # Probes answered by a table (or the cache)
+
+    # Small enough and no castling rights left, syzygy has neither
+    def can_probe(self, board):
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    # Win / draw / loss for the side to move (2 / 0 / -2, cursed wins and blessed losses count as draws) or None
+    def probe_wdl(self, board, key):
+        self.probes += 1
+
+        wdl = self.cache.lookup(key)
+        if wdl is None:
+            wdl = self.tablebase.get_wdl(board)
+            if wdl is None:
+                return None
+
+            self.cache.store(key, wdl)
+
+        self.hits += 1
+        return 2 if wdl == 2 else -2 if wdl == -2 else 0
+
+    # Score for the side to move at <ply>, wins found nearer the root score higher
+    def get_score(self, wdl, ply):
+        if wdl > 0:
+            return TB_WIN - ply
+        if wdl < 0:
+            return -TB_WIN + ply
+        return 0
+
+    # Root move straight from the tables: keep the best result, then make progress by dtz (win fastest, lose slowest)
+    # Returns (move, wdl) or (None, None) if any move can't be probed
+    def probe_root(self, board):
+        best_key = None
+        best = None, None
+
+        for move in board.legal_moves:
+            board.push(move)
+            if board.is_checkmate():
+                board.pop()
+                return move, 2
+
+            wdl = self.tablebase.get_wdl(board)
+            dtz = self.tablebase.get_dtz(board)
+            board.pop()
+
+            if wdl is None or dtz is None:
+                return None, None
+
+            # Child values are from the opponent's side
+            wdl = -wdl
+            dtz = -dtz
+            if wdl > 0:
+                key = (wdl, -abs(dtz))
+            elif wdl < 0:
+                key = (wdl, abs(dtz))
+            else:
+                key = (0, 0)
+
+            if best_key is None or key > best_key:
+                best_key = key
+                best = move, wdl
+
+        return best
+
+    def close(self):
+        self.tablebase.close()
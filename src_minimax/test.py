@@ -1,7 +1,97 @@
 from engine import Engine
 import chess
+import sys
+
+# Nodes at equal depth over consecutive moves, tt/killers kept between moves vs reset every move
+def compare_persistence(fen, depth, plies):
+    board = chess.Board(fen)
+    kept = Engine()
+    reset = Engine()
+    kept.verbose = reset.verbose = False
+    kept_total = reset_total = 0
+
+    for ply in range(plies):
+        move = kept.get_best_move(board, depth)
+        kept_total += kept.total_nodes
+
+        reset.new_game()
+        reset.get_best_move(board, depth)
+        reset_total += reset.total_nodes
+
+        print(f"ply {ply}: {move} - kept {kept.total_nodes} / reset {reset.total_nodes} nodes")
+        board.push(move)
+
+    print(f"Total: kept {kept_total} / reset {reset_total} nodes ({100 - kept_total * 100 / reset_total:.1f}% fewer)")
+
+def make_engine(pruning):
+    engine = Engine()
+    engine.verbose = False
+    engine.null_move = engine.lmr = pruning
+    return engine
+
+# Nodes and result at equal depth, null move + lmr on vs off
+def compare_pruning(fens, depth):
+    for fen in fens:
+        results = []
+        for pruning in (True, False):
+            engine = make_engine(pruning)
+            move = engine.get_best_move(chess.Board(fen), depth)
+            results.append((move, engine.total_nodes))
+
+        (move_on, nodes_on), (move_off, nodes_off) = results
+        print(f"{fen}: {move_on} / {move_off}, {nodes_on} / {nodes_off} nodes ({100 - nodes_on * 100 / nodes_off:.1f}% fewer)")
+
+# Games at equal nodes per move, pruning on vs off with both colors from every opening
+def compare_strength(fens, nodes, max_plies=120):
+    points = 0
+    for fen in fens:
+        for pruning_color in chess.COLORS:
+            board = chess.Board(fen)
+            engines = {pruning_color: make_engine(True), not pruning_color: make_engine(False)}
+
+            while not board.is_game_over(claim_draw=True) and len(board.move_stack) < max_plies:
+                board.push(engines[board.turn].get_best_move(board, nodes=nodes))
+
+            result = board.result(claim_draw=True)
+            if result == "*":
+                result = "1/2-1/2"  # Adjudicated at max_plies
+            score = {"1-0": 1, "0-1": 0, "1/2-1/2": 0.5}[result]
+            points += score if pruning_color == chess.WHITE else 1 - score
+            print(f"{fen} pruning as {chess.COLOR_NAMES[pruning_color]}: {result}")
+
+    print(f"Pruning on: {points} / {len(fens) * 2}")
+
+OPENINGS = [
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4",
+    "r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "8/5pk1/6p1/8/5P2/6PK/8/8 w - - 0 1",
+]
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "persist":
+        compare_persistence("r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4", 4, 8)
+        compare_persistence("r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7", 4, 8)
+        sys.exit()
+
+    # Search stats of one position as json, plus the top of a cProfile of the same search
+    if len(sys.argv) > 1 and sys.argv[1] == "stats":
+        import cProfile
+        import pstats
+
+        engine = Engine()
+        engine.verbose = False
+        engine.profiler = cProfile.Profile()
+        engine.get_best_move(chess.Board(OPENINGS[0]), 6)
+        print(engine.stats.to_json())
+        pstats.Stats(engine.profiler).sort_stats("tottime").print_stats(15)
+        sys.exit()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "pruning":
+        compare_pruning(OPENINGS, 5)
+        compare_strength(OPENINGS[:2], 20000)
+        sys.exit()
+
     board = chess.Board("r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4")
     engine = Engine()
 
@@ -24,6 +114,13 @@ if __name__ == "__main__":
 # 4: b1c3 (+0.00) - 46409 nodes @ 24.44 kn/s
 # 5: b1c3 (+0.15) - 167143 nodes @ 31.00 kn/s
 
+# incremental eval (material/pst/pawn deltas on push/pop), same box before -> after
+# 3: b1c3 (+0.17) - 6408 nodes @ 6.35 -> 9.64 kn/s
+# 4: b1c3 (+0.00) - 42311 nodes @ 4.68 -> 7.69 kn/s
+
+# + zobrist tt, bitboard njit eval kernel (get_eval ~190us -> ~5us)
+# 4: b1c3 (+0.00) - 27554 nodes @ 11.33 kn/s
+
 
 # ANOMALY: FEN: r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R - White to move
 # With tt
@@ -39,3 +136,64 @@ if __name__ == "__main__":
 # 4: a4b3 (+0.15) - 18644 nodes @ 25.60 kn/s
 # 5: a4b3 (+0.30) - 146779 nodes @ 32.76 kn/s
 
+
+# Persistent tt + killers across moves (python test.py persist), depth 4, 8 plies, total nodes kept / reset
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: 243100 / 295673 (17.8% fewer)
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: 138094 / 171701 (19.6% fewer)
+
+# Negamax + PVS + aspiration windows (50cp from depth 4), depth 5, cumulative nodes over all iterations
+# Same moves and scores at every depth, before -> after
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: 160259 -> 140418 (-12.4%)
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: 95284 -> 84854 (-10.9%)
+
+# Bound-typed tt cutoffs with ply-normalized mates, depth 5, tt scores used vs ignored (tt move still ordered)
+# Same moves and scores with and without, the anomaly above is gone
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: b1c3 +0.15, 140418 / 152477
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: a4b3 +0.12, 84854 / 115741
+# k7/8/2K5/8/8/8/8/7Q w - - 0 1: c6c7 mate in 2 (99997) either way, 732 / 768 (re-measured later on a legal position)
+# Searching the same root twice no longer returns straight from the tt (11780 nodes, then 140)
+
+# Null move (R=2, null window nodes, needs a piece) + lmr (quiet non-killers from the 4th move, 1-2 plies, re-searched on fail high)
+# python test.py pruning, depth 5, on / off, same moves everywhere
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: b1c3, 22649 / 140418 nodes (83.9% fewer)
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: a4b3, 12270 / 84854 nodes (85.5% fewer)
+# rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5: f1b5, 28231 / 124227 nodes (77.3% fewer)
+# 8/5pk1/6p1/8/5P2/6PK/8/8 w - - 0 1: h3h2, 1021 / 1267 nodes (19.4% fewer, no null move without pieces)
+# 20000 nodes/move, first 2 openings both colors: 2.0 / 4 (all drawn or adjudicated at 120 plies), needs more games to tell
+
+# Ply-indexed numpy killers + butterfly history + counter moves for quiet ordering, cumulative nodes, before -> after
+# Depth 5, pruning on (off)
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: 22649 -> 16412 (140418 -> 114898)
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: 12270 -> 12352 (84854 -> 83171)
+# rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5: 28231 -> 21265 (124227 -> 120003)
+# 8/5pk1/6p1/8/5P2/6PK/8/8 w - - 0 1: 1021 -> 867 (1267 -> 1566)
+# Depth 6: 41158 -> 34536 and 40551 -> 40837, same moves
+
+# SEE (attackers_mask swap list with x-rays): losing captures ordered after quiets, skipped in quiescence, before -> after
+# Depth 5, pruning on (off), same moves
+# r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 4 4: 16412 -> 10107 (114898 -> 100185)
+# r1bqkb1r/2p2ppp/p1np1n2/1p2p3/B3P3/2NP1N2/PPP2PPP/R1BQK2R w KQkq - 0 7: 12352 -> 9715 (83171 -> 69052)
+# rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5: 21265 -> 16284 (120003 -> 110474)
+# Depth 6: 34536 -> 25275 and 40837 -> 34715, python test.py pruning 29.4s -> 18.6s
+
+# Staged lazy move picker (tt move, good captures, killers, quiets, bad captures), depth 6 over OPENINGS, before -> after
+# Same moves, same order for a given history; nodes move a little since history is now read when the quiets are reached
+# 99207 -> 103344 nodes, 5.59s -> 4.56s, 17.7 -> 22.7 kn/s
+
+# Mate / stalemate from the move loop, bitboard insufficient material (matches python-chess on 546k random positions)
+# In check at the horizon searches one more ply instead of dropping into quiescence
+# Depth 6 over OPENINGS, back to back runs: 103344 -> 103158 nodes, 5.35s -> 4.42s
+
+# Search stats (python test.py stats), depth 6 on the first opening
+# 30528 nodes (14856 quiescence), tt hit rate 8.0%, 601 tt cutoffs, 93.9% of beta cutoffs on the first move, ebf 2.85
+# Incremental eval updates ~12us per push (18187 updates for 15002 evals read), ~12% of the search; move generation + push are the top of the profile
+# Counters cost nothing measurable: depth 6 over OPENINGS 4.53s without, 4.51-4.54s with
+
+# Batched eval, 100k random game positions, identical to get_eval on every position
+# get_eval_batch(boards): ~15.7M positions/min, get_eval_fens(fen lines, parsed in njit): ~26.6M positions/min
+
+# Texel tuner: feature rows . weights.py matches get_eval exactly on 100k random game positions (python tuner.py --check N)
+# Extraction ~24.5k positions/s per process, 100k positions in a 3 epoch run ~11s including extraction
+
+# Repetition / fifty move draws from the zobrist key stack, matches board.is_repetition(2) on 9000 random shuffling plies
+# Depth 6 over OPENINGS: 103158 -> 103307 nodes, 3.89s -> 3.56s (check is noise level)
@@ -0,0 +1,74 @@
+import chess
+import time
+import settings
+
+# Raised from inside the search once the hard deadline passes
+class SearchTimeout(Exception):
+    pass
+
+class TimeManager:
+    def __init__(self):
+        self.start_time = time.time()  # Budget start, moved by set_limits on ponderhit
+        self.search_start = self.start_time  # Reported search time, never moved
+        self.turn = chess.WHITE
+        self.soft_limit = None  # Don't start a new iteration past this (s)
+        self.hard_limit = None  # Abort the running iteration past this (s)
+
+    # Clock values in ms, same names as lichess / uci
+    def start(self, turn, wtime=None, btime=None, winc=0, binc=0, movestogo=None, movetime=None):
+        self.search_start = time.time()
+        self.turn = turn
+        self.set_limits(wtime, btime, winc, binc, movestogo, movetime)
+
+    # New budget from now without restarting the search clock, for ponderhit
+    def set_limits(self, wtime=None, btime=None, winc=0, binc=0, movestogo=None, movetime=None):
+        self.start_time = time.time()
+        turn = self.turn
+        self.soft_limit = None
+        self.hard_limit = None
+
+        overhead = settings.MOVE_OVERHEAD_MS
+
+        # Fixed time per move
+        if movetime is not None:
+            self.soft_limit = self.hard_limit = max(movetime - overhead, 10) / 1000
+            return
+
+        time_left = wtime if turn == chess.WHITE else btime
+        inc = (winc if turn == chess.WHITE else binc) or 0
+
+        # No clock, depth limited only
+        if time_left is None:
+            return
+
+        time_left = max(time_left - overhead, 10)
+        moves_left = min(movestogo or 30, 50)
+
+        # Spread the clock over the remaining moves, most of the increment is ours to spend
+        optimum = time_left / moves_left + inc * 0.75
+        self.soft_limit = min(optimum, time_left * 0.4) / 1000
+        self.hard_limit = min(optimum * 3, time_left * 0.75) / 1000
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    # Since the search began, ponder time included
+    def search_elapsed(self):
+        return time.time() - self.search_start
+
+    def out_of_time(self):
+        return self.hard_limit is not None and self.elapsed() >= self.hard_limit
+
+    # Predict the next depth from how the last one grew over the one before it
+    def can_start_iteration(self, last_time, prev_time):
+        if self.soft_limit is None:
+            return True
+
+        elapsed = self.elapsed()
+        if elapsed >= self.soft_limit:
+            return False
+
+        branching = last_time / prev_time if prev_time > 0 else 4
+        branching = min(max(branching, 2), 8)
+
+        return elapsed + last_time * branching <= self.hard_limit
@@ -1,30 +1,187 @@
 import chess
+import math
+import numpy as np
+from multiprocessing import shared_memory
 
+# Bound types
+EXACT = 0
+LOWER = 1  # Score is at least this (fail high)
+UPPER = 2  # Score is at most this (fail low)
+
+# Mated at ply p from the root scores -(MATE_SCORE - p), anything past MATE_BOUND is a mate
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+
+# Tablebase win at ply p scores TB_WIN - p, just under the mates so a real mate is still preferred
+# Anything past TB_BOUND (mates included) depends on the ply
+TB_WIN = 90000
+TB_BOUND = TB_WIN - 1000
+
+BUCKET_SIZE = 4
+ENTRY_BYTES = 16  # uint64 key + uint64 packed data
+
+# Packed data layout (low -> high bits)
+# move 16 | score 32 | depth 8 | flag 2 | age 6
+SCORE_OFFSET = 1 << 31
+DEPTH_OFFSET = 128
+
+# Move <-> 16 bit int (from 6 | to 6 | promotion 3)
+def pack_move(move):
+    if move is None:
+        return 0
+
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def unpack_move(packed):
+    if packed == 0:
+        return None
+
+    return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+# Mate and tablebase scores are stored relative to the node (win in n from here) so they stay valid at any ply
+def score_to_tt(score, ply):
+    if score > TB_BOUND:
+        return score + ply
+    if score < -TB_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score > TB_BOUND:
+        return score - ply
+    if score < -TB_BOUND:
+        return score + ply
+    return score
+
+# Fixed size, bucketed table stored in two numpy arrays
+# Keys are stored xored with their data so torn writes from other processes are rejected (lockless sharing)
 class TranspositionTable:
-    def __init__(self):
-        self.table = {}
+    def __init__(self, size_mb=64, shared=False, name=None):
+        self.age = 0
+        self.shm = None
+        self.hits = 0  # Probes finding their key, this process only
+        self.misses = 0
+        self.resize(size_mb, shared, name)
+
+    # <shared> puts the arrays in new shared memory, <name> attaches to an existing table
+    def resize(self, size_mb, shared=False, name=None):
+        self.close()
+
+        entries = max(BUCKET_SIZE, (size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.size_mb = size_mb
+        self.num_buckets = entries // BUCKET_SIZE
+        size = self.num_buckets * BUCKET_SIZE
+
+        if not (shared or name):
+            self.keys = np.zeros(size, dtype=np.uint64)
+            self.data = np.zeros(size, dtype=np.uint64)
+            return
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * ENTRY_BYTES)
+            self.owner = True
+        else:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # Python < 3.13
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self.keys = np.ndarray(size, dtype=np.uint64, buffer=self.shm.buf)
+        self.data = np.ndarray(size, dtype=np.uint64, buffer=self.shm.buf, offset=size * 8)
 
-    def store(self, hash, depth, score, best_move=None):
-        if hash in self.table:
-            if depth < self.table[hash]["depth"]:  # Only add higher depth entries
+        if self.owner:
+            self.clear()
+
+    def get_name(self):
+        return self.shm.name if self.shm else None
+
+    # Releases shared memory, the creating process also unlinks it
+    def close(self):
+        if self.shm is None:
+            return
+
+        self.keys = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    # Called once per search so older entries become replaceable
+    def new_search(self):
+        self.age = (self.age + 1) & 63
+
+    def store(self, key, depth, score, flag, best_move=None, ply=0):
+        start = (key % self.num_buckets) * BUCKET_SIZE
+        bucket_data = self.data[start:start + BUCKET_SIZE].tolist()
+        bucket_keys = [k ^ d for k, d in zip(self.keys[start:start + BUCKET_SIZE].tolist(), bucket_data)]
+
+        if key in bucket_keys:
+            slot = bucket_keys.index(key)
+            old = bucket_data[slot]
+            old_depth = ((old >> 48) & 255) - DEPTH_OFFSET
+            old_age = old >> 58
+
+            # Only add higher depth entries, unless the old one is from a past search or the new one is exact
+            if depth < old_depth and old_age == self.age and flag != EXACT:
                 return
 
-        self.table[hash] = {
-            "depth": depth,
-            "score": score,
-            "best_move": best_move,
-        }
+            # Keep the old move rather than losing it
+            if best_move is None:
+                best_move = unpack_move(old & 0xFFFF)
+
+        elif 0 in bucket_keys:
+            slot = bucket_keys.index(0)
 
-    def lookup(self, hash, depth):
-        if hash not in self.table:
+        else:
+            # Replace the stalest, then shallowest entry
+            slot = min(range(BUCKET_SIZE), key=lambda i: self.replace_value(bucket_data[i]))
+
+        depth = min(max(depth, -DEPTH_OFFSET), 255 - DEPTH_OFFSET)
+        score = score_to_tt(int(score), ply)
+
+        packed = (pack_move(best_move)
+                  | ((score + SCORE_OFFSET) << 16)
+                  | ((depth + DEPTH_OFFSET) << 48)
+                  | (flag << 56)
+                  | (self.age << 58))
+
+        self.keys[start + slot] = key ^ packed
+        self.data[start + slot] = packed
+
+    # Lower is replaced first
+    def replace_value(self, packed):
+        depth = ((packed >> 48) & 255) - DEPTH_OFFSET
+        age = packed >> 58
+        return depth - 8 * ((self.age - age) & 63)
+
+    # Returns a usable score (or None) plus the stored move for ordering
+    def lookup(self, key, depth, alpha=-math.inf, beta=math.inf, ply=0):
+        start = (key % self.num_buckets) * BUCKET_SIZE
+        bucket_data = self.data[start:start + BUCKET_SIZE].tolist()
+        bucket_keys = [k ^ d for k, d in zip(self.keys[start:start + BUCKET_SIZE].tolist(), bucket_data)]
+
+        if key not in bucket_keys:
+            self.misses += 1
             return None, None
 
-        entry = self.table[hash]
+        self.hits += 1
+        packed = bucket_data[bucket_keys.index(key)]
+        best_move = unpack_move(packed & 0xFFFF)
+        entry_depth = ((packed >> 48) & 255) - DEPTH_OFFSET
+
+        if entry_depth < depth:
+            return None, best_move
+
+        score = score_from_tt(((packed >> 16) & 0xFFFFFFFF) - SCORE_OFFSET, ply)
+        flag = (packed >> 56) & 3
 
-        if entry["depth"] >= depth:
-            return entry["score"], entry["best_move"]
+        # Bounds are only usable if they fall outside the window
+        if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+            return score, best_move
 
-        return None, entry["best_move"]
+        return None, best_move
 
     def clear(self):
-        self.table = {}
\ No newline at end of file
+        self.keys.fill(0)
+        self.data.fill(0)
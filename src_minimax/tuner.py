@@ -0,0 +1,392 @@
+import argparse
+import chess
+import chess.pgn
+import importlib
+import itertools
+import math
+import multiprocessing as mp
+import numpy as np
+import os
+import random
+import re
+import settings
+from numba import njit
+from evaluator import FEN_WIDTH, KING_SAFETY_MIN_PIECES, get_eval_fens, parse_fen_kernel, popcount
+
+# Texel tuning: the eval is linear in its weights, so every position becomes a row of feature counts (white minus
+# black) and eval = features . weights. Weights are fitted so sigmoid(eval) predicts the game results.
+# python tuner.py games.pgn positions.epd --output weights_tuned.py, then settings.WEIGHTS_MODULE = "weights_tuned"
+
+PIECE_NAMES = ["PAWN", "KNIGHT", "BISHOP", "ROOK", "QUEEN", "KING"]
+TERMS = ["DOUBLED_PAWN", "PASSED_PAWN", "PASSED_PAWN_DISTANCE", "KINGSIDE_CASTLING", "QUEENSIDE_CASTLING",
+         "SHELTER_KING_FILE", "SHELTER_ADJACENT_FILE", "KING_EXPOSURE", "KING_CENTER_FILE"]
+
+# Feature layout: pawn..queen values, the 6 piece-square tables, then the named terms
+MATERIAL_INDEX = 0
+PST_INDEX = 5
+TERM_INDEX = PST_INDEX + 6 * 64
+NUM_FEATURES = TERM_INDEX + len(TERMS)
+
+# Weights module -> vector in feature order
+def load_weights(module_name):
+    weights = importlib.import_module(module_name)
+    vector = np.zeros(NUM_FEATURES)
+
+    vector[MATERIAL_INDEX:MATERIAL_INDEX + 5] = weights.PIECE_VALUES[1:6]
+    for i, name in enumerate(PIECE_NAMES):
+        vector[PST_INDEX + i * 64:PST_INDEX + (i + 1) * 64] = getattr(weights, name + "_TABLE")
+    for i, name in enumerate(TERMS):
+        vector[TERM_INDEX + i] = getattr(weights, name)
+
+    return vector
+
+# Vector -> weights module source, same layout as weights.py
+def format_weights(vector):
+    vector = np.rint(vector).astype(int)
+    lines = [
+        "# Eval weights in centipawns, white's point of view",
+        "# Written by tuner.py",
+        "",
+        "# None, pawn, knight, bishop, rook, queen, king (can't be captured, stays 0)",
+        f"PIECE_VALUES = [0, {', '.join(str(v) for v in vector[MATERIAL_INDEX:MATERIAL_INDEX + 5])}, 0]",
+        "",
+        "# Piece-square tables from white's side, a8 first",
+    ]
+
+    for i, name in enumerate(PIECE_NAMES):
+        table = vector[PST_INDEX + i * 64:PST_INDEX + (i + 1) * 64]
+        lines.append(f"{name}_TABLE = [")
+        for rank in range(8):
+            row = ",".join(f"{v:4d}" for v in table[rank * 8:rank * 8 + 8])
+            lines.append(f"    {row}" + ("," if rank < 7 else ""))
+        lines.append("]")
+        lines.append("")
+
+    for i, name in enumerate(TERMS):
+        lines.append(f"{name} = {vector[TERM_INDEX + i]}")
+
+    return "\n".join(lines) + "\n"
+
+# Mirrors evaluate_bitboards term by term, python tuner.py --check compares the two
+@njit
+def feature_kernel(bitboards, row):
+    row[:] = 0
+    pawns, knights, bishops, rooks, queens, kings, white, black, castling_rights = bitboards
+
+    # Material and piece-square tables
+    for square in range(64):
+        if (pawns >> square) & 1:
+            piece_type = 1
+        elif (knights >> square) & 1:
+            piece_type = 2
+        elif (bishops >> square) & 1:
+            piece_type = 3
+        elif (rooks >> square) & 1:
+            piece_type = 4
+        elif (queens >> square) & 1:
+            piece_type = 5
+        elif (kings >> square) & 1:
+            piece_type = 6
+        else:
+            continue
+
+        if (white >> square) & 1:
+            if piece_type < 6:
+                row[MATERIAL_INDEX + piece_type - 1] += 1
+            row[PST_INDEX + (piece_type - 1) * 64 + (square ^ 56)] += 1
+        else:
+            if piece_type < 6:
+                row[MATERIAL_INDEX + piece_type - 1] -= 1
+            row[PST_INDEX + (piece_type - 1) * 64 + square] -= 1
+
+    # Pawn structure
+    white_pawns = pawns & white
+    black_pawns = pawns & black
+    white_counts = np.zeros(8, dtype=np.int32)
+    black_counts = np.zeros(8, dtype=np.int32)
+    black_max_rank = np.full(8, -1, dtype=np.int32)
+    white_min_rank = np.full(8, 8, dtype=np.int32)
+
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        if (white_pawns >> square) & 1:
+            white_counts[file] += 1
+            white_min_rank[file] = min(white_min_rank[file], rank)
+        elif (black_pawns >> square) & 1:
+            black_counts[file] += 1
+            black_max_rank[file] = max(black_max_rank[file], rank)
+
+    for file in range(8):
+        if white_counts[file] > 1:
+            row[TERM_INDEX + 0] -= white_counts[file] - 1
+        if black_counts[file] > 1:
+            row[TERM_INDEX + 0] += black_counts[file] - 1
+
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        low, high = max(file - 1, 0), min(file + 1, 7)
+
+        if (white_pawns >> square) & 1:
+            passed = True
+            for e_file in range(low, high + 1):
+                if black_max_rank[e_file] > rank:
+                    passed = False
+            if passed:
+                row[TERM_INDEX + 1] += 1
+                row[TERM_INDEX + 2] += 7 - rank
+
+        elif (black_pawns >> square) & 1:
+            passed = True
+            for e_file in range(low, high + 1):
+                if white_min_rank[e_file] < rank:
+                    passed = False
+            if passed:
+                row[TERM_INDEX + 1] -= 1
+                row[TERM_INDEX + 2] -= rank
+
+    # King safety
+    if popcount(white | black) <= KING_SAFETY_MIN_PIECES:
+        return
+
+    white_king = -1
+    black_king = -1
+    for square in range(64):
+        if (kings >> square) & 1:
+            if (white >> square) & 1:
+                white_king = square
+            elif (black >> square) & 1:
+                black_king = square
+
+    if white_king < 0 or black_king < 0:
+        return
+
+    for side in range(2):
+        if side == 0:
+            own, multiplier, back_rank = white, 1, 0
+            king_sq, own_pawns = white_king, white_pawns
+        else:
+            own, multiplier, back_rank = black, -1, 7
+            king_sq, own_pawns = black_king, black_pawns
+
+        back_kings = (kings & own) >> (back_rank * 8) & 255
+        if back_kings:
+            back_king_file = 0
+            for file in range(8):
+                if (back_kings >> file) & 1:
+                    back_king_file = file
+            kingside = False
+            queenside = False
+            for file in range(8):
+                if (castling_rights >> (back_rank * 8 + file)) & 1:
+                    if file > back_king_file:
+                        kingside = True
+                    elif file < back_king_file or back_kings != (1 << file):
+                        queenside = True
+            if kingside:
+                row[TERM_INDEX + 3] += multiplier
+            if queenside:
+                row[TERM_INDEX + 4] += multiplier
+
+        king_file, king_rank = king_sq & 7, king_sq >> 3
+        low_rank = 1 if side == 0 else 5
+        for check_file in range(king_file - 1, king_file + 2):
+            if 0 <= check_file <= 7:
+                if ((own_pawns >> (low_rank * 8 + check_file)) & 1) or ((own_pawns >> ((low_rank + 1) * 8 + check_file)) & 1):
+                    if check_file == king_file:
+                        row[TERM_INDEX + 5] += multiplier
+                    else:
+                        row[TERM_INDEX + 6] += multiplier
+
+        if side == 0 and king_rank > 2:
+            row[TERM_INDEX + 7] -= multiplier * (king_rank - 2)
+        elif side == 1 and king_rank < 5:
+            row[TERM_INDEX + 7] -= multiplier * (5 - king_rank)
+
+        if 2 <= king_file <= 5:
+            row[TERM_INDEX + 8] -= multiplier
+
+@njit
+def features_kernel(chars):
+    features = np.zeros((chars.shape[0], NUM_FEATURES), dtype=np.int8)
+    bitboards = np.zeros(9, dtype=np.int64)
+
+    for i in range(chars.shape[0]):
+        parse_fen_kernel(chars[i], bitboards)
+        feature_kernel(bitboards, features[i])
+
+    return features
+
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+EPD_RESULT = re.compile(r'(1-0|0-1|1/2-1/2)|\[(1\.0|0\.5|0\.0|1|0)\]')
+
+# (fen, white score) from a game per position, the opening plies are skipped
+def read_pgn(path, skip_plies=8):
+    with open(path) as f:
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                return
+
+            result = RESULTS.get(game.headers.get("Result"))
+            if result is None:
+                continue
+
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                board.push(move)
+                if ply >= skip_plies and not board.is_check():
+                    yield board.fen(), result
+
+# One labelled position per line: 'fen c9 "1-0";', 'fen [0.5]' or 'fen 1/2-1/2'
+def read_epd(path):
+    with open(path) as f:
+        for line in f:
+            match = EPD_RESULT.search(line)
+            if match:
+                result = RESULTS[match.group(1)] if match.group(1) else float(match.group(2))
+                yield line, result
+
+def read_positions(paths):
+    for path in paths:
+        yield from read_pgn(path) if path.endswith(".pgn") else read_epd(path)
+
+# Worker: chunk of (fen, result) -> int8 feature rows, float32 results
+def extract_features(chunk):
+    chars = np.frombuffer(b"".join(fen.strip().encode()[:FEN_WIDTH].ljust(FEN_WIDTH) for fen, _ in chunk), dtype=np.uint8)
+    return features_kernel(chars.reshape(-1, FEN_WIDTH)), np.array([result for _, result in chunk], dtype=np.float32)
+
+# Streams the dataset through a process pool into <cache>.features / <cache>.results on disk,
+# only <processes> * 2 chunks are held in memory at a time so the dataset can be larger than ram
+def build_dataset(paths, cache, processes, chunk_size=16384):
+    positions = read_positions(paths)
+    chunks = iter(lambda: list(itertools.islice(positions, chunk_size)), [])
+    count = 0
+
+    with open(cache + ".features", "wb") as feature_file, open(cache + ".results", "wb") as result_file, mp.Pool(processes) as pool:
+        while True:
+            window = list(itertools.islice(chunks, processes * 2))
+            if not window:
+                break
+
+            for features, results in pool.map(extract_features, window):
+                feature_file.write(features.tobytes())
+                result_file.write(results.tobytes())
+                count += len(results)
+
+            print(f"{count} positions")
+
+    return load_dataset(cache)
+
+def load_dataset(cache):
+    results = np.memmap(cache + ".results", dtype=np.float32, mode="r")
+    features = np.memmap(cache + ".features", dtype=np.int8, mode="r", shape=(len(results), NUM_FEATURES))
+    return features, results
+
+def sigmoid(evals, k):
+    return 1 / (1 + np.power(10, -k * evals / 400))
+
+# Mean squared error between results and sigmoid(eval), read in batches from the memmaps
+def get_loss(features, results, weights, k, batch_size=65536):
+    total = 0
+    for start in range(0, len(results), batch_size):
+        evals = features[start:start + batch_size].astype(np.float32) @ weights
+        total += np.sum((results[start:start + batch_size] - sigmoid(evals, k)) ** 2)
+
+    return total / len(results)
+
+# Scaling constant that best fits the starting weights
+def fit_k(features, results, weights):
+    best_k, best_loss = 1, math.inf
+    for k in np.arange(0.2, 3.01, 0.1):
+        loss = get_loss(features, results, weights, k)
+        if loss < best_loss:
+            best_k, best_loss = k, loss
+
+    return best_k
+
+# Mini batch Adam over the memmapped rows, gradients fully vectorized per batch
+def tune(features, results, weights, k, epochs=20, batch_size=16384, learning_rate=1.0):
+    weights = weights.astype(np.float32)
+    fixed = np.zeros(NUM_FEATURES, dtype=bool)
+    fixed[PST_INDEX:PST_INDEX + 8] = fixed[PST_INDEX + 56:PST_INDEX + 64] = True  # Pawns never stand on the back ranks
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    step = 0
+    scale = k * math.log(10) / 400
+
+    for epoch in range(epochs):
+        for start in range(0, len(results), batch_size):
+            x = features[start:start + batch_size].astype(np.float32)
+            y = results[start:start + batch_size]
+            p = sigmoid(x @ weights, k)
+            gradient = x.T @ ((p - y) * p * (1 - p)) * (2 * scale / len(y))
+            gradient[fixed] = 0
+
+            step += 1
+            m = 0.9 * m + 0.1 * gradient
+            v = 0.999 * v + 0.001 * gradient ** 2
+            weights -= learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+
+        print(f"Epoch {epoch + 1}: loss {get_loss(features, results, weights, k):.6f}")
+
+    return weights
+
+# Positions from random games, or the first <count> of <paths>
+def sample_fens(paths, count, seed=0):
+    if paths:
+        return [fen for fen, _ in itertools.islice(read_positions(paths), count)]
+
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            fens.append(board.fen())
+
+    return fens[:count]
+
+# Feature rows . loaded weights against get_eval, returns the positions that differ
+def check_features(fens, module_name):
+    weights = load_weights(module_name)
+    features, _ = extract_features([(fen, 0) for fen in fens])
+    evals = np.rint(features.astype(np.float64) @ weights).astype(np.int64)
+    expected = get_eval_fens(fens).astype(np.int64)
+
+    return [(fens[i], evals[i], expected[i]) for i in np.nonzero(evals != expected)[0]]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", help=".pgn or labelled .epd files")
+    parser.add_argument("--cache", default="tuner_data", help="feature files on disk, reused with --reuse")
+    parser.add_argument("--reuse", action="store_true", help="skip extraction and tune on an existing cache")
+    parser.add_argument("--weights", default="weights", help="starting weights module")
+    parser.add_argument("--output", default="weights_tuned.py")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=1.0)
+    parser.add_argument("--processes", type=int, default=mp.cpu_count())
+    parser.add_argument("--check", type=int, metavar="N", help="compare features . weights with get_eval on N positions and exit")
+    args = parser.parse_args()
+
+    # get_eval runs on settings.WEIGHTS_MODULE, so that is the module checked
+    if args.check:
+        mismatches = check_features(sample_fens(args.paths, args.check), settings.WEIGHTS_MODULE)
+        for fen, features_eval, eval in mismatches[:10]:
+            print(f"{fen}: features {features_eval}, get_eval {eval}")
+        print(f"{args.check - len(mismatches)}/{args.check} positions match")
+        raise SystemExit(1 if mismatches else 0)
+
+    features, results = load_dataset(args.cache) if args.reuse else build_dataset(args.paths, args.cache, args.processes)
+    weights = load_weights(args.weights)
+
+    k = fit_k(features, results, weights)
+    print(f"{len(results)} positions, k {k:.2f}, loss {get_loss(features, results, weights, k):.6f}")
+
+    weights = tune(features, results, weights, k, args.epochs, learning_rate=args.learning_rate)
+
+    with open(args.output, "w") as f:
+        f.write(format_weights(weights))
+    print(f"Written to {args.output}, load it with settings.WEIGHTS_MODULE = \"{os.path.splitext(os.path.basename(args.output))[0]}\"")
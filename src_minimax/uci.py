@@ -0,0 +1,156 @@
+import chess
+import sys
+import threading
+import time
+import settings
+from engine import Engine
+from transposition_table import MATE_SCORE, MATE_BOUND
+
+# UCI front end on stdin/stdout, e.g. for cutechess or offline benchmarking
+class UCI:
+    def __init__(self):
+        self.engine = Engine()
+        self.engine.verbose = False
+        self.engine.info_callback = self.send_info
+        self.engine.stop_event = threading.Event()
+        self.board = chess.Board()
+        self.search_thread = None
+        self.infinite = False
+        self.go_clock = {}  # Clock from "go ponder ...", used once the ponderhit comes
+        self.threads = 1
+
+    def send(self, line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    def loop(self):
+        for line in sys.stdin:
+            tokens = line.split()
+            if not tokens:
+                continue
+
+            command = tokens[0]
+
+            if command == "uci":
+                self.send("id name XCCE")
+                self.send("id author EliotKasha")
+                self.send(f"option name Hash type spin default {settings.TT_SIZE_MB} min 1 max 65536")
+                self.send("option name Threads type spin default 1 min 1 max 256")
+                self.send("option name Ponder type check default false")
+                self.send("uciok")
+
+            elif command == "isready":
+                self.send("readyok")
+
+            elif command == "setoption":
+                self.wait()
+                self.set_option(tokens)
+
+            elif command == "ucinewgame":
+                self.wait()
+                self.engine.new_game()
+
+            elif command == "position":
+                self.wait()
+                self.set_position(tokens)
+
+            elif command == "go":
+                self.wait()
+                self.go(tokens)
+
+            elif command == "stop":
+                self.engine.stop_event.set()
+                self.wait()
+
+            elif command == "ponderhit":
+                self.engine.ponderhit(**self.go_clock)
+
+            elif command == "quit":
+                self.engine.stop_event.set()
+                self.wait()
+                break
+
+        self.engine.set_threads(1)
+
+    def set_option(self, tokens):
+        if "name" not in tokens or "value" not in tokens:
+            return
+
+        name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")]).lower()
+        value = tokens[tokens.index("value") + 1]
+
+        if name == "hash":
+            self.engine.set_hash(int(value))
+        elif name == "threads":
+            self.threads = int(value)
+            self.engine.set_threads(self.threads)
+
+    # position [startpos | fen <fen>] [moves <move> ...]
+    def set_position(self, tokens):
+        moves = []
+        if "moves" in tokens:
+            moves = tokens[tokens.index("moves") + 1:]
+            tokens = tokens[:tokens.index("moves")]
+
+        if len(tokens) > 1 and tokens[1] == "fen":
+            self.board = chess.Board(" ".join(tokens[2:]))
+        else:
+            self.board = chess.Board()
+
+        for move in moves:
+            self.board.push_uci(move)
+
+    def go(self, tokens):
+        limits = {}
+        ponder = "ponder" in tokens
+        self.infinite = "infinite" in tokens
+
+        for name in ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "nodes"):
+            if name in tokens:
+                limits[name] = int(tokens[tokens.index(name) + 1])
+
+        max_depth = int(tokens[tokens.index("depth") + 1]) if "depth" in tokens else settings.MAX_DEPTH
+
+        self.go_clock = {name: value for name, value in limits.items() if name != "nodes"}
+        self.engine.stop_event.clear()
+        self.engine.pondering = ponder
+
+        self.search_thread = threading.Thread(target=self.search, args=(self.board.copy(), max_depth, limits, ponder), daemon=True)
+        self.search_thread.start()
+
+    def search(self, board, max_depth, limits, ponder):
+        move = self.engine.get_best_move(board, max_depth, ponder=ponder, **limits)
+
+        # bestmove may only be sent after stop (infinite) or ponderhit
+        while (self.infinite or self.engine.pondering) and not self.engine.stop_event.is_set():
+            time.sleep(0.01)
+
+        line = f"bestmove {move}"
+        if self.engine.ponder_move:
+            line += f" ponder {self.engine.ponder_move}"
+        self.send(line)
+
+    def wait(self):
+        if self.search_thread:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def send_info(self, depth, score, nodes, elapsed, pv):
+        # Engine scores are from white's side, uci wants the side to move
+        if self.board.turn == chess.BLACK:
+            score = -score
+
+        if abs(score) > MATE_BOUND:
+            # Mate scores count plies from the root
+            mate = (MATE_SCORE - abs(score) + 1) // 2
+            score_str = f"mate {mate if score > 0 else -mate}"
+        else:
+            score_str = f"cp {int(score)}"
+
+        elapsed_ms = int(elapsed * 1000)
+        nps = int(nodes / max(elapsed, 1e-6))
+        self.send(f"info depth {depth} score {score_str} nodes {nodes} nps {nps} time {elapsed_ms} pv {' '.join(str(move) for move in pv)}")
+
+
+if __name__ == "__main__":
+    UCI().loop()
@@ -0,0 +1,100 @@
+import chess
+import chess.polyglot
+
+RANDOM_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+HASHER = chess.polyglot.ZobristHasher(RANDOM_ARRAY)
+
+# Polyglot piece keys indexed [color][piece_type][square]
+PIECE_KEYS = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+for _color in chess.COLORS:
+    for _piece_type in chess.PIECE_TYPES:
+        for _square in chess.SQUARES:
+            PIECE_KEYS[_color][_piece_type][_square] = RANDOM_ARRAY[64 * ((_piece_type - 1) * 2 + int(_color)) + _square]
+
+TURN_KEY = RANDOM_ARRAY[780]
+
+# Full 64 bit polyglot key of <board>
+def get_hash(board):
+    return chess.polyglot.zobrist_hash(board)
+
+def get_ep_key(board):
+    if board.ep_square is None:
+        return 0
+
+    return HASHER.hash_ep_square(board)
+
+# Keys of the game positions before <board> back to the last capture, pawn move or null move, oldest first
+def get_history_keys(board):
+    keys = []
+    board = board.copy()
+
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        if not board.pop():
+            break
+        keys.append(get_hash(board))
+
+    keys.reverse()
+    return keys
+
+# Zobrist key kept up to date by xoring deltas on push/pop, same value as chess.polyglot.zobrist_hash
+class IncrementalHash:
+    def __init__(self):
+        self.stack = []  # (key, castling key, ep key, plies since an irreversible move) per ply
+        self.history = []  # Game keys before the root that can still repeat
+
+    def reset(self, board):
+        self.history = get_history_keys(board)
+        self.stack = [(get_hash(board), HASHER.hash_castling(board), get_ep_key(board), len(self.history))]
+
+    # Call with the board already pushed, <before> being the pieces on <squares> and <castling_rights> prior to the move
+    def push(self, board, squares, before, castling_rights):
+        key, castling_key, ep_key, reversible = self.stack[-1]
+
+        for square, old_piece in zip(squares, before):
+            new_piece = board.piece_at(square)
+
+            if old_piece == new_piece:
+                continue
+
+            if old_piece:
+                key ^= PIECE_KEYS[old_piece.color][old_piece.piece_type][square]
+
+            if new_piece:
+                key ^= PIECE_KEYS[new_piece.color][new_piece.piece_type][square]
+
+        if board.castling_rights != castling_rights:
+            key ^= castling_key
+            castling_key = HASHER.hash_castling(board)
+            key ^= castling_key
+
+        key ^= ep_key
+        ep_key = get_ep_key(board)
+        key ^= ep_key
+
+        key ^= TURN_KEY
+
+        # Captures, pawn moves and null moves can't be undone, nothing before them can repeat
+        reversible = reversible + 1 if board.halfmove_clock and board.move_stack[-1] else 0
+
+        self.stack.append((key, castling_key, ep_key, reversible))
+
+    def pop(self):
+        self.stack.pop()
+
+    def get_key(self):
+        return self.stack[-1][0]
+
+    # Current key seen before, only every other ply back to the last irreversible move can match
+    # O(plies since that move) instead of python-chess replaying the move stack
+    def is_repetition(self):
+        key, _, _, reversible = self.stack[-1]
+        searched = len(self.stack)
+
+        for distance in range(2, reversible + 1, 2):
+            if distance < searched:
+                if self.stack[-1 - distance][0] == key:
+                    return True
+            elif self.history[len(self.history) - 1 - (distance - searched)] == key:
+                return True
+
+        return False